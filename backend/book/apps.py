@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class BookConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "book"
+
+    def ready(self):
+        import book.signals  # noqa: F401
+        from book.search import ensure_trigram_index
+
+        post_migrate.connect(ensure_trigram_index, sender=self)
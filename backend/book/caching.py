@@ -0,0 +1,136 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Author, Book, Genre, Publisher
+
+BOOK_CARD_TIMEOUT = 60 * 60
+
+# readers move the counters all the time, so they are kept out of the
+# generations (and updated_at) and merged into cached payloads when those
+# are served
+COUNTER_FIELDS = Book.COUNTER_FIELDS
+# validators of pages showing counters of many books are renewed this often
+COUNTER_STALENESS = 60
+
+
+def generation_key(model):
+    return f"catalog_generation_{model._meta.label_lower}"
+
+
+def get_generations(models):
+    values = cache.get_many([generation_key(model) for model in models])
+    return [values.get(generation_key(model), 0) for model in models]
+
+
+def _bump(models):
+    for model in models:
+        try:
+            cache.incr(generation_key(model))
+        except ValueError:
+            cache.set(generation_key(model), 1, timeout=None)
+
+
+def bump_generation(*models):
+    """
+    Invalidate every cached response built from `models`. Bumped again on
+    commit so a page cached from the old rows while the transaction was
+    still open does not outlive it.
+    """
+    _bump(models)
+    transaction.on_commit(lambda: _bump(models))
+
+
+def normalized_params(query_params, ignore=()):
+    return sorted(
+        (key, value)
+        for key in query_params
+        if key not in ignore
+        for value in query_params.getlist(key)
+    )
+
+
+def params_digest(*parts):
+    return hashlib.md5(repr(parts).encode()).hexdigest()
+
+
+def response_cache_key(request, view, generations):
+    digest = params_digest(
+        request.get_host(),
+        request.path,
+        normalized_params(request.query_params),
+        request.accepted_renderer.format,
+    )
+    generations = "-".join(map(str, generations))
+    return f"catalog_response_{view.basename}_{view.action}_{generations}_{digest}"
+
+
+def book_card_keys(book_ids):
+    """
+    Fragment keys of the default list card of each book. Author, publisher
+    and genre generations are part of the key so renaming a related object
+    retires every card without looking up the books it is attached to.
+    """
+    generations = "-".join(map(str, get_generations([Author, Publisher, Genre])))
+    return {pk: f"book_card_{generations}_{pk}" for pk in book_ids}
+
+
+def _forget_book_cards(book_ids):
+    cache.delete_many(list(book_card_keys(book_ids).values()))
+
+
+def books_changed(book_ids):
+    """
+    Invalidate cached responses and cards after a write to `book_ids`,
+    including queryset updates that do not send post_save.
+    """
+    book_ids = list(book_ids)
+    bump_generation(Book)
+    if book_ids:
+        _forget_book_cards(book_ids)
+        transaction.on_commit(lambda: _forget_book_cards(book_ids))
+
+
+def counters_epoch():
+    """Part of list versions, bounds how long a 304 can keep old counters."""
+    return int(time.time() // COUNTER_STALENESS)
+
+
+def with_counters(item, book):
+    """A copy of the cached payload `item` with the counters of `book`."""
+    return {
+        **item,
+        **{name: getattr(book, name) for name in COUNTER_FIELDS if name in item},
+    }
+
+
+def merge_counters(items):
+    """
+    Overwrite the counters in cached book payloads (dicts with an "id")
+    with the current values, one query for all of them.
+    """
+    items = [item for item in items if isinstance(item, dict) and "id" in item]
+    names = {name for item in items for name in item if name in COUNTER_FIELDS}
+    if any("rating_histogram" in item for item in items):
+        names.update(f"rating_{star}" for star in range(1, 6))
+    if not names:
+        return
+
+    rows = {
+        row["pk"]: row
+        for row in Book.objects.filter(pk__in=[item["id"] for item in items]).values(
+            "pk", *names
+        )
+    }
+    for item in items:
+        row = rows.get(item["id"])
+        if row is None:
+            continue
+        for name in names & item.keys():
+            item[name] = row[name]
+        if "rating_histogram" in item:
+            item["rating_histogram"] = {
+                str(star): row[f"rating_{star}"] for star in range(1, 6)
+            }
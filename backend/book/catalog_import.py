@@ -0,0 +1,343 @@
+import io
+import json
+import random
+from dataclasses import dataclass, field
+
+from django.db import connection, transaction
+from django.utils.dateparse import parse_date
+
+from .caching import books_changed, bump_generation
+from .isbn import clean_isbn, is_valid_isbn, to_isbn13
+from .models import Author, Book, Genre, Publisher
+from .search import update_search_vector
+
+BOOK_UPDATE_FIELDS = [
+    "isbn13",
+    "title",
+    "description",
+    "published_at",
+    "page_count",
+    "language",
+    "cover_image",
+    "updated_at",
+]
+
+
+def iter_json_array(fp, key, chunk_size=1 << 16):
+    """
+    Yield the items of the top level `key` array of a JSON document without
+    loading the whole document, e.g. the dumps written by scripts/getData.py.
+    """
+    decoder = json.JSONDecoder()
+    marker = f'"{key}"'
+    buffer = ""
+
+    while True:
+        index = buffer.find(marker)
+        start = buffer.find("[", index) if index != -1 else -1
+        if start != -1:
+            buffer = buffer[start:].removeprefix("[")
+            break
+
+        chunk = fp.read(chunk_size)
+        if not chunk:
+            return
+        buffer += chunk
+
+    while True:
+        buffer = buffer.lstrip(" \t\r\n,")
+        if buffer.startswith("]"):
+            return
+
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            chunk = fp.read(chunk_size)
+            if not chunk:
+                raise
+            buffer += chunk
+            continue
+
+        yield item
+        buffer = buffer[end:]
+
+
+def batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _parse_date(value):
+    try:
+        return parse_date(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _names(value):
+    names = []
+    for item in value or []:
+        name = item.get("name") if isinstance(item, dict) else item
+        if name:
+            names.append(str(name).strip())
+    return names
+
+
+@dataclass
+class ImportReport:
+    created: dict = field(default_factory=dict)
+    rejected: list = field(default_factory=list)
+
+    def add(self, kind, count):
+        self.created[kind] = self.created.get(kind, 0) + count
+
+    def reject(self, kind, position, reason, item):
+        self.rejected.append(
+            {"type": kind, "position": position, "reason": reason, "item": item}
+        )
+
+
+class CatalogImporter:
+    """
+    Batched, rerunnable catalog import.
+
+    Authors are matched by name, publishers and genres by their unique name
+    and books by ISBN, so importing the same dump twice updates rows in
+    place instead of duplicating them.
+    """
+
+    def __init__(self, batch_size=1000, seed_relations=False, progress=None):
+        self.batch_size = batch_size
+        self.seed_relations = seed_relations
+        self.progress = progress or (lambda message: None)
+        self.report = ImportReport()
+        self._ids = {Author: {}, Publisher: {}, Genre: {}}
+        self._pools = None
+
+    def import_authors(self, items):
+        for batch in batched(items, self.batch_size):
+            authors = {}
+            for item in batch:
+                name = (item.get("name") or "").strip()[:100]
+                if name:
+                    authors[name] = item
+
+            with transaction.atomic():
+                existing = {
+                    author.name: author
+                    for author in Author.objects.filter(name__in=authors)
+                }
+                new, changed = [], []
+                for name, item in authors.items():
+                    birth_date = _parse_date(item.get("born_date"))
+                    death_date = _parse_date(item.get("death_date"))
+                    author = existing.get(name)
+                    if author is None:
+                        new.append(
+                            Author(
+                                name=name,
+                                birth_date=birth_date,
+                                death_date=death_date,
+                            )
+                        )
+                    elif (author.birth_date, author.death_date) != (
+                        birth_date,
+                        death_date,
+                    ):
+                        author.birth_date = birth_date
+                        author.death_date = death_date
+                        changed.append(author)
+
+                Author.objects.bulk_create(new)
+                Author.objects.bulk_update(changed, ["birth_date", "death_date"])
+                bump_generation(Author)
+
+            self.report.add("authors", len(new))
+            self.progress(f"Authors: {self.report.created['authors']} created")
+
+    def import_publishers(self, items):
+        self._import_named(Publisher, "publishers", items, max_length=255)
+
+    def import_genres(self, items):
+        self._import_named(Genre, "genres", items, max_length=100)
+
+    def _import_named(self, model, kind, items, max_length):
+        for batch in batched(items, self.batch_size):
+            names = {name[:max_length] for name in _names(batch)}
+            with transaction.atomic():
+                before = model.objects.filter(name__in=names).count()
+                model.objects.bulk_create(
+                    [model(name=name) for name in names], ignore_conflicts=True
+                )
+                bump_generation(model)
+            self.report.add(kind, len(names) - before)
+            self.progress(f"{kind.capitalize()}: {self.report.created[kind]} created")
+
+    def import_books(self, items):
+        position = 0
+        for batch in batched(items, self.batch_size):
+            books = {}
+            for item in batch:
+                position += 1
+                book, reason = self.clean_book(item)
+                if reason:
+                    self.report.reject("book", position, reason, item)
+                else:
+                    books[book.isbn13 or book.isbn] = (book, item)
+
+            with transaction.atomic():
+                self._save_books(list(books.values()))
+
+            self.report.add("books", len(books))
+            self.progress(
+                f"Books: {self.report.created['books']} imported, "
+                f"{len(self.report.rejected)} rejected"
+            )
+
+    def clean_book(self, item):
+        title = (item.get("title") or "").strip()
+        if not title:
+            return None, "missing title"
+
+        # the same check as BookSerializer.validate_isbn, checksum included
+        isbn = clean_isbn(
+            item.get("isbn_13") or item.get("isbn_10") or item.get("isbn")
+        )
+        if not is_valid_isbn(isbn):
+            return None, "invalid isbn"
+
+        try:
+            page_count = int(item.get("pages") or item.get("page_count") or 0)
+        except (TypeError, ValueError):
+            page_count = 0
+
+        language = item.get("language") or "English"
+        if isinstance(language, dict):
+            language = language.get("language") or "English"
+        language = language.split(";")[-1].strip()[:30] or "English"
+
+        images = item.get("images") or []
+        cover_image = images[0].get("url") if images else item.get("cover_image")
+
+        book = Book(
+            title=title[:255],
+            description=item.get("description"),
+            isbn=isbn,
+            isbn13=to_isbn13(isbn),
+            published_at=_parse_date(
+                item.get("release_date") or item.get("published_at")
+            ),
+            page_count=page_count if page_count > 0 else None,
+            language=language,
+            cover_image=cover_image,
+        )
+        return book, None
+
+    def _save_books(self, rows):
+        if not rows:
+            return
+
+        # the same edition may already be stored under its other notation,
+        # upsert into that row instead of tripping the isbn13 constraint
+        stored = dict(
+            Book.objects.filter(
+                isbn13__in=[book.isbn13 for book, _ in rows if book.isbn13]
+            ).values_list("isbn13", "isbn")
+        )
+        for book, _ in rows:
+            book.isbn = stored.get(book.isbn13, book.isbn)
+
+        books = Book.objects.bulk_create(
+            [book for book, _ in rows],
+            update_conflicts=True,
+            unique_fields=["isbn"],
+            update_fields=BOOK_UPDATE_FIELDS,
+        )
+
+        relations = {"authors": [], "genres": [], "publishers": []}
+        for book, (_, item) in zip(books, rows):
+            for name, ids in self.resolve_relations(book, item).items():
+                relations[name].extend((book.pk, pk) for pk in ids)
+
+        for name, pairs in relations.items():
+            self._insert_through_rows(getattr(Book, name).through, pairs)
+
+        update_search_vector(book.pk for book in books)
+        books_changed(book.pk for book in books)
+
+    def resolve_relations(self, book, item):
+        relations = {
+            "authors": self._lookup(Author, _names(item.get("authors"))),
+            "genres": self._lookup(Genre, _names(item.get("genres"))),
+            "publishers": self._lookup(Publisher, _names(item.get("publishers"))),
+        }
+        if self.seed_relations:
+            # deterministic per ISBN so rerunning the seed is a no-op
+            rng = random.Random(book.isbn)
+            for name, pool in self.relation_pools().items():
+                if not relations[name] and pool:
+                    relations[name] = rng.sample(
+                        pool, rng.randrange(1, min(4, len(pool)) + 1)
+                    )
+        return relations
+
+    def relation_pools(self):
+        if self._pools is None:
+            self._pools = {
+                name: list(model.objects.order_by("pk").values_list("pk", flat=True))
+                for name, model in (
+                    ("authors", Author),
+                    ("genres", Genre),
+                    ("publishers", Publisher),
+                )
+            }
+        return self._pools
+
+    def _lookup(self, model, names):
+        cache = self._ids[model]
+        missing = {name for name in names if name not in cache}
+        if missing:
+            cache.update(
+                model.objects.filter(name__in=missing).values_list("name", "pk")
+            )
+        return {cache[name] for name in names if name in cache}
+
+    def _insert_through_rows(self, through, pairs):
+        if not pairs:
+            return
+
+        source, target = [
+            f.column for f in through._meta.concrete_fields if f.is_relation
+        ]
+        table = through._meta.db_table
+
+        with connection.cursor() as cursor:
+            if not hasattr(cursor.cursor, "copy_expert"):
+                through.objects.bulk_create(
+                    [through(**{source: a, target: b}) for a, b in pairs],
+                    ignore_conflicts=True,
+                )
+                return
+
+            # COPY into a staging table, then let the unique constraint on
+            # the through table drop rows that already exist
+            cursor.execute("DROP TABLE IF EXISTS import_through_rows")
+            cursor.execute(
+                "CREATE TEMPORARY TABLE import_through_rows "
+                "(source_id bigint, target_id bigint) ON COMMIT DROP"
+            )
+            cursor.cursor.copy_expert(
+                "COPY import_through_rows (source_id, target_id) FROM STDIN",
+                io.StringIO("".join(f"{a}\t{b}\n" for a, b in pairs)),
+            )
+            cursor.execute(
+                f'INSERT INTO "{table}" ("{source}", "{target}") '
+                "SELECT DISTINCT source_id, target_id FROM import_through_rows "
+                "ON CONFLICT DO NOTHING"
+            )
@@ -0,0 +1,230 @@
+from collections import defaultdict
+
+from django.conf import settings
+
+try:
+    import numpy as np
+except ImportError:  # optional, BookFilter answers everything without it
+    np = None
+
+from .indexes import BackgroundBuild, InProcessIndex
+from .models import Author, Book, Genre
+
+# BookFilter parameters the index can answer on its own
+INDEXED_FILTERS = {
+    "min_pages",
+    "max_pages",
+    "published_after",
+    "published_before",
+    "language",
+    "genres__name",
+    "authors__name__icontains",
+}
+
+
+class CatalogIndex(InProcessIndex):
+    """
+    In-process, array-backed copy of the columns the browse filters touch.
+
+    page_count and published_at (as ordinal days) are float columns with
+    NaN for unknown values, so range masks drop them like SQL does, and
+    languages are small integer codes. Genres are dense boolean bitmaps,
+    authors sorted arrays of row positions since there are far too many of
+    them for a bitmap each. Rows are addressed by position, `positions`
+    maps a book id to its row and deleted books are only marked dead.
+    """
+
+    # larger matches are cheaper to leave to SQL than to ship as an id list
+    max_ids = 10000
+
+    def _reset(self):
+        self.size = self.capacity = 0
+        self.positions = {}
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.alive = np.zeros(0, dtype=bool)
+        self.page_count = np.zeros(0)
+        self.published = np.zeros(0)
+        self.language = np.zeros(0, dtype=np.int32)
+        self.languages = {}
+        self.genres = {}
+        self.genre_ids = {}
+        self.authors = {}
+        self.book_authors = {}
+        self.author_ids = np.zeros(0, dtype=np.int64)
+        self.author_names = np.array([], dtype=str)
+        self.known_authors = set()
+
+    def _load_names(self):
+        self.genre_ids = dict(Genre.objects.values_list("name", "pk"))
+        authors = list(Author.objects.values_list("pk", "name"))
+        self.author_ids = np.array([pk for pk, _ in authors], dtype=np.int64)
+        self.author_names = np.array([name.lower() for _, name in authors], dtype=str)
+        self.known_authors = {pk for pk, _ in authors}
+
+    def _grow(self, needed):
+        if needed <= self.capacity:
+            return
+        capacity = max(needed, 2 * self.capacity, 1024)
+
+        def grow(array, fill):
+            grown = np.full(capacity, fill, dtype=array.dtype)
+            grown[: len(array)] = array
+            return grown
+
+        self.ids = grow(self.ids, 0)
+        self.alive = grow(self.alive, False)
+        self.page_count = grow(self.page_count, np.nan)
+        self.published = grow(self.published, np.nan)
+        self.language = grow(self.language, -1)
+        self.genres = {pk: grow(bitmap, False) for pk, bitmap in self.genres.items()}
+        self.capacity = capacity
+
+    def _position(self, pk):
+        if pk not in self.positions:
+            self._grow(self.size + 1)
+            self.positions[pk] = self.size
+            self.ids[self.size] = pk
+            self.size += 1
+        return self.positions[pk]
+
+    def _refresh(self, book_ids):
+        rows = list(
+            Book.objects.filter(pk__in=book_ids).values_list(
+                "pk", "page_count", "published_at", "language"
+            )
+        )
+        found = {row[0] for row in rows}
+        gone = [
+            self.positions[pk]
+            for pk in book_ids
+            if pk not in found and pk in self.positions
+        ]
+        self.alive[gone] = False
+        if not rows:
+            return
+
+        positions = [self._position(pk) for pk, *_ in rows]
+        index = np.array(positions, dtype=np.int64)
+        self.alive[index] = True
+        self.page_count[index] = [
+            np.nan if pages is None else pages for _, pages, _, _ in rows
+        ]
+        self.published[index] = [
+            np.nan if date is None else date.toordinal() for _, _, date, _ in rows
+        ]
+        self.language[index] = [
+            self.languages.setdefault(language, len(self.languages))
+            for *_, language in rows
+        ]
+
+        by_genre = defaultdict(list)
+        for book_id, genre_id in Book.genres.through.objects.filter(
+            book_id__in=found
+        ).values_list("book_id", "genre_id"):
+            by_genre[genre_id].append(self.positions[book_id])
+        for bitmap in self.genres.values():
+            bitmap[index] = False
+        for genre_id, rows_with_genre in by_genre.items():
+            if genre_id not in self.genres:
+                self.genres[genre_id] = np.zeros(self.capacity, dtype=bool)
+            self.genres[genre_id][rows_with_genre] = True
+
+        by_author = defaultdict(list)
+        written_by = defaultdict(list)
+        for book_id, author_id in Book.authors.through.objects.filter(
+            book_id__in=found
+        ).values_list("book_id", "author_id"):
+            by_author[author_id].append(self.positions[book_id])
+            written_by[self.positions[book_id]].append(author_id)
+        previous = {
+            author_id
+            for pos in positions
+            for author_id in self.book_authors.get(pos, ())
+        }
+        for author_id in previous | set(by_author):
+            postings = self.authors.get(author_id, index[:0])
+            postings = np.union1d(
+                np.setdiff1d(postings, index, assume_unique=True),
+                np.array(by_author.get(author_id, ()), dtype=np.int64),
+            )
+            self.authors[author_id] = postings
+        for pos in positions:
+            self.book_authors[pos] = written_by.get(pos, ())
+
+        # relations created after the names were loaded
+        if not by_genre.keys() <= set(self.genre_ids.values()) or not (
+            by_author.keys() <= self.known_authors
+        ):
+            self._load_names()
+
+    def match(self, values):
+        """
+        Ids of live books matching the cleaned BookFilter `values`, or None
+        when there are more than `max_ids` of them.
+        """
+        with self.lock:
+            size = self.size
+            mask = self.alive[:size].copy()
+
+            if values.get("min_pages") is not None:
+                mask &= self.page_count[:size] >= float(values["min_pages"])
+            if values.get("max_pages") is not None:
+                mask &= self.page_count[:size] <= float(values["max_pages"])
+            if values.get("published_after") is not None:
+                mask &= self.published[:size] >= values["published_after"].toordinal()
+            if values.get("published_before") is not None:
+                mask &= self.published[:size] <= values["published_before"].toordinal()
+
+            if values.get("language"):
+                code = self.languages.get(values["language"], -1)
+                mask &= self.language[:size] == code
+
+            if values.get("genres__name"):
+                bitmap = self.genres.get(self.genre_ids.get(values["genres__name"]))
+                if bitmap is None:
+                    return self.ids[:0]
+                mask &= bitmap[:size]
+
+            if values.get("authors__name__icontains"):
+                needle = values["authors__name__icontains"].lower()
+                hits = self.author_ids[np.char.find(self.author_names, needle) >= 0]
+                postings = [self.authors[pk] for pk in hits if pk in self.authors]
+                written = np.zeros(size, dtype=bool)
+                if postings:
+                    written[np.concatenate(postings)] = True
+                mask &= written
+
+            if np.count_nonzero(mask) > self.max_ids:
+                return None
+            return self.ids[:size][mask]
+
+
+_index = None
+
+
+def build_catalog_index():
+    """Build the process-wide index and start serving it."""
+    global _index
+    index = CatalogIndex()
+    index.rebuild()
+    _index = index
+    return index
+
+
+_build = BackgroundBuild(build_catalog_index)
+
+
+def get_catalog_index():
+    """
+    The process-wide index, or None when it is not enabled with the
+    CATALOG_COLUMNAR_INDEX setting, numpy is missing or it is still being
+    built. The first call starts the build in a background thread, until
+    it is done the filters run in SQL.
+    """
+    if np is None or not getattr(settings, "CATALOG_COLUMNAR_INDEX", False):
+        return None
+    if _index is None:
+        _build.start()
+        return None
+    _index.sync()
+    return _index
@@ -0,0 +1,145 @@
+from django.db.models import (
+    Count,
+    ExpressionWrapper,
+    F,
+    FloatField,
+    Q,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Cast, Coalesce, Greatest, NullIf
+
+from .models import Book
+
+SHELF_TYPE_COUNTERS = {
+    "want_to_read": "want_to_read_count",
+    "currently_reading": "currently_reading_count",
+    "read": "read_count",
+}
+
+
+# Counter writes leave updated_at and the catalog generations alone, cached
+# payloads pick the values up through book.caching.merge_counters.
+
+
+def _increment(book_ids, fields, delta):
+    if book_ids and fields:
+        Book.objects.filter(pk__in=book_ids).update(
+            **{name: Greatest(F(name) + delta, 0) for name in fields}
+        )
+
+
+def update_engagement_counters(shelf, book_ids, delta, exclude_shelves=None):
+    """
+    Apply `delta` (+1 added, -1 removed) for `book_ids` put on or taken off
+    `shelf`. A book only gains or loses a reader when no other shelf of the
+    same user holds it.
+    """
+    book_ids = set(book_ids)
+    if not book_ids:
+        return
+
+    elsewhere = Book.shelves.through.objects.filter(
+        shelf__user_id=shelf.user_id, book_id__in=book_ids
+    ).exclude(shelf_id=shelf.pk)
+    if exclude_shelves is not None:
+        elsewhere = elsewhere.exclude(exclude_shelves)
+    readers = book_ids - set(elsewhere.values_list("book_id", flat=True))
+
+    fields = []
+    if shelf.is_default and shelf.shelf_type in SHELF_TYPE_COUNTERS:
+        fields.append(SHELF_TYPE_COUNTERS[shelf.shelf_type])
+
+    _increment(readers, ["readers_count", *fields], delta)
+    _increment(book_ids - readers, fields, delta)
+
+
+def engagement_counts():
+    """Annotations recomputing the engagement counters from shelf rows."""
+    counts = {"readers_count": Count("shelves__user", distinct=True)}
+    for shelf_type, name in SHELF_TYPE_COUNTERS.items():
+        counts[name] = Count(
+            "shelves",
+            filter=Q(shelves__is_default=True, shelves__shelf_type=shelf_type),
+        )
+    return counts
+
+
+def reconcile_counters(book_ids, counts):
+    """Recompute `counts` for `book_ids` and fix rows that drifted."""
+    drifted = []
+    books = (
+        Book.objects.filter(pk__in=book_ids)
+        .only("pk", *counts)
+        .annotate(**{f"actual_{name}": expr for name, expr in counts.items()})
+    )
+    for book in books:
+        changed = False
+        for name in counts:
+            actual = getattr(book, f"actual_{name}")
+            if getattr(book, name) != actual:
+                setattr(book, name, actual)
+                changed = True
+        if changed:
+            drifted.append(book)
+
+    if drifted:
+        Book.objects.bulk_update(drifted, list(counts))
+    return len(drifted)
+
+
+def rating_scores(count, total):
+    """Average and bayesian average expressions for a count and a sum."""
+    weight = Book.RATING_PRIOR_WEIGHT
+    return {
+        "rating_average": ExpressionWrapper(
+            Cast(total, FloatField()) / NullIf(count, 0), output_field=FloatField()
+        ),
+        "rating_bayesian": ExpressionWrapper(
+            (Value(Book.RATING_PRIOR_MEAN * weight) + Cast(total, FloatField()))
+            / (Value(float(weight)) + Cast(count, FloatField())),
+            output_field=FloatField(),
+        ),
+    }
+
+
+def update_rating_summary(book_id, old=None, new=None):
+    """
+    Move one review's rating from `old` to `new` (None for a created or
+    deleted review) in a single UPDATE of the book row.
+    """
+    if old == new:
+        return
+
+    count_delta = (new is not None) - (old is not None)
+    sum_delta = (new or 0) - (old or 0)
+    count = F("rating_count") + count_delta
+    total = F("rating_sum") + sum_delta
+
+    updates = {"rating_count": count, "rating_sum": total}
+    if old is not None:
+        updates[f"rating_{old}"] = Greatest(F(f"rating_{old}") - 1, 0)
+    if new is not None:
+        updates[f"rating_{new}"] = F(f"rating_{new}") + 1
+    updates.update(rating_scores(count, total))
+
+    Book.objects.filter(pk=book_id).update(**updates)
+
+
+def rating_counts():
+    """Annotations recomputing the rating summary from review rows."""
+    counts = {
+        "rating_count": Count("book_reviews"),
+        "rating_sum": Coalesce(Sum("book_reviews__rating"), 0),
+    }
+    for star in range(1, 6):
+        counts[f"rating_{star}"] = Count(
+            "book_reviews", filter=Q(book_reviews__rating=star)
+        )
+    return counts
+
+
+def refresh_rating_scores(book_ids):
+    Book.objects.filter(pk__in=book_ids).update(
+        **rating_scores(F("rating_count"), F("rating_sum"))
+    )
@@ -0,0 +1,73 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+
+from .models import Author, Book, Genre, Publisher
+
+EXPORT_FIELDS = [
+    "id",
+    "isbn",
+    "title",
+    "description",
+    "published_at",
+    "page_count",
+    "language",
+    "cover_image",
+]
+RELATED_FIELDS = ["authors", "genres", "publishers"]
+
+
+class Echo:
+    """File-like object that hands written rows back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def iter_catalog(chunk_size=2000):
+    """
+    Yield every book as a plain dict. Rows are read through a server side
+    cursor and the M2M relations are prefetched once per chunk, so memory
+    use does not grow with the size of the catalog.
+    """
+    queryset = (
+        Book.objects.order_by("pk")
+        .only(*EXPORT_FIELDS)
+        .prefetch_related(
+            Prefetch("authors", queryset=Author.objects.only("id", "name")),
+            Prefetch("genres", queryset=Genre.objects.only("id", "name")),
+            Prefetch("publishers", queryset=Publisher.objects.only("id", "name")),
+        )
+    )
+
+    for book in queryset.iterator(chunk_size=chunk_size):
+        row = {name: getattr(book, name) for name in EXPORT_FIELDS}
+        for name in RELATED_FIELDS:
+            row[name] = [
+                {"id": related.pk, "name": related.name}
+                for related in getattr(book, name).all()
+            ]
+        yield row
+
+
+def render_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + "\n"
+
+
+def render_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS + RELATED_FIELDS)
+    for row in rows:
+        yield writer.writerow(
+            [row[name] for name in EXPORT_FIELDS]
+            + ["|".join(item["name"] for item in row[name]) for name in RELATED_FIELDS]
+        )
+
+
+EXPORT_FORMATS = {
+    "ndjson": (render_ndjson, "application/x-ndjson"),
+    "csv": (render_csv, "text/csv"),
+}
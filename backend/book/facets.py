@@ -0,0 +1,106 @@
+from django.core.cache import cache
+from django.db.models import CharField, Count, F, IntegerField, Value
+from django.db.models.functions import Cast, ExtractYear
+from rest_framework.exceptions import ValidationError
+
+from .caching import get_generations, normalized_params, params_digest
+from .models import Author, Book, Genre
+
+FACETS_PARAM = "facets"
+FACETS_CACHE_TIMEOUT = 60
+
+# query parameters that only shape the page, not the matching set
+IGNORED_PARAMS = {
+    FACETS_PARAM,
+    "page",
+    "page_size",
+    "cursor",
+    "pagination",
+    "ordering",
+    "fields",
+    "expand",
+    "format",
+}
+
+
+def _genres(book_ids):
+    return (
+        Book.genres.through.objects.filter(book__in=book_ids)
+        .values(value=F("genre__name"))
+        .annotate(facet=Value("genres"), count=Count("*"))
+    )
+
+
+def _language(book_ids):
+    return (
+        Book.objects.filter(pk__in=book_ids)
+        .values(value=F("language"))
+        .annotate(facet=Value("language"), count=Count("*"))
+    )
+
+
+def _decade(book_ids):
+    return (
+        Book.objects.filter(pk__in=book_ids, published_at__isnull=False)
+        .values(
+            value=Cast(
+                Cast(ExtractYear("published_at"), IntegerField()) / 10 * 10,
+                output_field=CharField(),
+            )
+        )
+        .annotate(facet=Value("decade"), count=Count("*"))
+    )
+
+
+FACETS = {
+    "genres": _genres,
+    "language": _language,
+    "decade": _decade,
+}
+
+
+def parse_facets(value):
+    names = [name.strip() for name in (value or "").split(",") if name.strip()]
+    unknown = sorted(set(names) - set(FACETS))
+    if unknown:
+        raise ValidationError(
+            {FACETS_PARAM: f"Unknown facets {unknown}, use any of {sorted(FACETS)}"}
+        )
+    return sorted(set(names))
+
+
+def facets_cache_key(query_params, names):
+    digest = params_digest(normalized_params(query_params, IGNORED_PARAMS), names)
+    # authors__name filters the matched books, so an author rename changes them
+    generations = "-".join(map(str, get_generations([Book, Author, Genre])))
+    return f"book_facets_{generations}_{digest}"
+
+
+def facet_counts(queryset, names):
+    """
+    Count every requested facet over the books matched by `queryset` in a
+    single UNION ALL statement, most frequent values first.
+    """
+    book_ids = queryset.order_by().values("pk")
+    parts = [FACETS[name](book_ids).values("facet", "value", "count") for name in names]
+    counts = {name: [] for name in names}
+    if not parts:
+        return counts
+
+    for row in parts[0].union(*parts[1:], all=True):
+        value = row["value"]
+        if row["facet"] == "decade":
+            value = int(value)
+        counts[row["facet"]].append({"value": value, "count": row["count"]})
+
+    for rows in counts.values():
+        rows.sort(key=lambda row: (-row["count"], str(row["value"])))
+    return counts
+
+
+def cached_facet_counts(request, queryset, names):
+    return cache.get_or_set(
+        facets_cache_key(request.query_params, names),
+        lambda: facet_counts(queryset, names),
+        timeout=FACETS_CACHE_TIMEOUT,
+    )
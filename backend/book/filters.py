@@ -1,7 +1,15 @@
 from django_filters import rest_framework as filters
+from django_filters.utils import translate_validation
+from django.db.models import Case, FloatField, Q, Value, When
 from django.utils import timezone
+from rest_framework import filters as drf_filters
 from rest_framework.exceptions import ValidationError
+from .columnar import INDEXED_FILTERS, get_catalog_index
+from .isbn import clean_isbn, to_isbn13
 from .models import Book, Genre
+from .search import search_books
+from .semantic import get_semantic_index
+from .spelling import get_spelling_index
 from .serializers import GenreSerializer
 
 
@@ -27,30 +35,153 @@ class BookFilter(filters.FilterSet):
 
     title = filters.CharFilter(field_name="title", lookup_expr="icontains")
 
+    isbn = filters.CharFilter(method="filter_isbn")
+
     class Meta:
         model = Book
         fields = {
             "title": ["icontains"],
-            "isbn": ["exact"],
             "language": ["exact"],
             "authors__name": ["icontains"],
             "genres__name": ["exact"],
             "page_count": ["exact"],
         }
 
+    def filter_isbn(self, queryset, name, value):
+        # either notation of the same edition finds it
+        isbn13 = to_isbn13(value)
+        if isbn13 is None:
+            return queryset.filter(isbn=clean_isbn(value))
+        return queryset.filter(Q(isbn13=isbn13) | Q(isbn=clean_isbn(value)))
+
     def validate_published_after(self, queryset, name, value):
         return queryset.filter(**{"published_at__gte": value})
 
     def validate_published_before(self, queryset, name, value):
-        if value > timezone.now().date():
-            raise ValidationError(
-                "Published before date cannot be in the future")
+        check_published_before(value)
         return queryset.filter(**{"published_at__lte": value})
 
 
+def check_published_before(value):
+    if value > timezone.now().date():
+        raise ValidationError(
+            "Published before date cannot be in the future")
+
+
+class ColumnarFilterBackend(filters.DjangoFilterBackend):
+    """
+    Answers the browse filters (page and date ranges, language, genre and
+    author) from the in-process CatalogIndex when it is enabled and hands
+    the matching ids to the queryset instead of joining in SQL. Anything
+    else, and matches too large for an id list, goes through BookFilter.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        index = get_catalog_index()
+        if index is None:
+            return super().filter_queryset(request, queryset, view)
+
+        filterset = self.get_filterset(request, queryset, view)
+        if filterset is None:
+            return queryset
+        if not filterset.is_valid() and self.raise_exception:
+            raise translate_validation(filterset.errors)
+
+        values = {
+            name: value
+            for name, value in filterset.form.cleaned_data.items()
+            if value not in (None, "")
+        }
+        if not values or not values.keys() <= INDEXED_FILTERS:
+            return filterset.qs
+
+        if values.get("published_before") is not None:
+            check_published_before(values["published_before"])
+        ids = index.match(values)
+        if ids is None:
+            return filterset.qs
+        return queryset.filter(pk__in=ids.tolist())
+
+
 class GenreFilter(filters.FilterSet):
     name = filters.CharFilter(field_name='name', lookup_expr='icontains')
 
     class Meta:
         model = Genre
         fields = ['name']
+
+
+class BookSearchFilter(drf_filters.SearchFilter):
+    """
+    Ranked full text search over the stored search vector instead of
+    icontains lookups across the author and genre joins. With
+    `?autocorrect=true` a search with few hits is run again with the best
+    spelling correction, which is left on the view as `corrected_search`.
+    """
+
+    autocorrect_param = "autocorrect"
+    # fewer hits than this and the query is worth correcting
+    few_hits = 3
+
+    def filter_queryset(self, request, queryset, view):
+        search_terms = self.get_search_terms(request)
+        if not search_terms:
+            return queryset
+
+        text = " ".join(search_terms)
+        results = search_books(queryset, text)
+        if request.query_params.get(self.autocorrect_param) not in ("1", "true"):
+            return results
+        if len(results[: self.few_hits]) >= self.few_hits:
+            return results
+
+        index = get_spelling_index()
+        suggestions = index.suggest(text, limit=1) if index is not None else []
+        if not suggestions:
+            return results
+        view.corrected_search = suggestions[0]["text"]
+        return search_books(queryset, view.corrected_search)
+
+
+class SemanticSearchFilter(drf_filters.BaseFilterBackend):
+    """
+    `?semantic=cozy mystery in Paris` ranks books by the LSA similarity of
+    their title and description to the text. Until the index has been built
+    with build_semantic_index it is answered by the full text search.
+    """
+
+    semantic_param = "semantic"
+    max_results = 200
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.semantic_param, "").strip()
+        if not text:
+            return queryset
+
+        index = get_semantic_index()
+        if index is None:
+            return search_books(queryset, text)
+
+        matches = index.search(text, self.max_results)
+        return (
+            queryset.filter(pk__in=[pk for pk, _ in matches])
+            .annotate(
+                search_rank=Case(
+                    *[When(pk=pk, then=Value(score)) for pk, score in matches],
+                    output_field=FloatField(),
+                )
+            )
+            .order_by("-search_rank", "pk")
+        )
+
+
+class BookOrderingFilter(drf_filters.OrderingFilter):
+    def filter_queryset(self, request, queryset, view):
+        # keep relevance order for searches unless the client asked otherwise
+        if (
+            "search_rank" in queryset.query.annotations
+            and not request.query_params.get(self.ordering_param)
+        ):
+            return queryset
+
+        return super().filter_queryset(request, queryset, view)
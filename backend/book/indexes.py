@@ -0,0 +1,150 @@
+import logging
+import threading
+import time
+import weakref
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .caching import get_generations
+from .catalog_import import batched
+from .models import Author, Book, Genre
+
+logger = logging.getLogger(__name__)
+
+# every in-process index built in this process, kept current by book.signals
+_indexes = weakref.WeakSet()
+
+
+class InProcessIndex:
+    """
+    Base of the catalog indexes a process keeps in memory. Subclasses load
+    author and genre data in `_load_names()` and (re)load a batch of books
+    in `_refresh()`, which also has to forget the ids that no longer exist.
+
+    Writes made in this process are applied by book.signals once they are
+    committed. Writes from other processes are picked up by `sync()`.
+    """
+
+    TRACKED = (Book, Author, Genre)
+
+    batch_size = 5000
+    # how often a process checks the catalog generations for foreign writes
+    sync_interval = 5
+    # re-read books touched slightly before the last sync, see sync()
+    sync_overlap = timedelta(minutes=1)
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.generations = None
+        self.synced_at = None
+        self.checked_at = 0
+        self._reset()
+        _indexes.add(self)
+
+    def _reset(self):
+        raise NotImplementedError
+
+    def _load_names(self):
+        raise NotImplementedError
+
+    def _refresh(self, book_ids):
+        raise NotImplementedError
+
+    def rebuild(self):
+        with self.lock:
+            started = timezone.now()
+            generations = get_generations(self.TRACKED)
+            self._reset()
+            self._load_names()
+
+            last_pk = 0
+            while True:
+                batch = list(
+                    Book.objects.filter(pk__gt=last_pk)
+                    .order_by("pk")
+                    .values_list("pk", flat=True)[: self.batch_size]
+                )
+                if not batch:
+                    break
+                self._refresh(batch)
+                last_pk = batch[-1]
+            self.generations, self.synced_at = generations, started
+
+    def sync(self):
+        """
+        Catch up with writes made by other processes. Book writes move
+        updated_at (queryset updates included), so only rows touched since
+        the last sync are re-read. Books deleted elsewhere linger until the
+        next rebuild, callers check results against the database.
+        """
+        if self.generations is None:
+            return self.rebuild()
+        if time.monotonic() - self.checked_at < self.sync_interval:
+            return
+
+        with self.lock:
+            self.checked_at = time.monotonic()
+            generations = get_generations(self.TRACKED)
+            if generations == self.generations:
+                return
+
+            started = timezone.now()
+            if generations[1:] != self.generations[1:]:
+                self._load_names()
+            if generations[0] != self.generations[0]:
+                self.refresh(
+                    Book.objects.filter(
+                        updated_at__gte=self.synced_at - self.sync_overlap
+                    ).values_list("pk", flat=True)
+                )
+            self.generations, self.synced_at = generations, started
+
+    def refresh(self, book_ids):
+        with self.lock:
+            for batch in batched(book_ids, self.batch_size):
+                self._refresh(batch)
+
+    def reload_names(self):
+        with self.lock:
+            self._load_names()
+
+
+class BackgroundBuild:
+    """
+    Runs `build` once in a daemon thread, so a process-wide index is filled
+    without a request waiting for the full catalog scan. A failed build is
+    logged and started again by the next `start()`.
+    """
+
+    def __init__(self, build):
+        self.build = build
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+
+    def _run(self):
+        try:
+            self.build()
+        except Exception:
+            logger.exception("%s failed", self.build.__name__)
+            self.thread = None
+        finally:
+            connection.close()
+
+
+def refresh_books(book_ids):
+    book_ids = list(book_ids)
+    for index in list(_indexes):
+        transaction.on_commit(lambda index=index: index.refresh(book_ids))
+
+
+def reload_names():
+    for index in list(_indexes):
+        transaction.on_commit(index.reload_names)
@@ -0,0 +1,70 @@
+import logging
+
+import isbnlib
+
+logger = logging.getLogger(__name__)
+
+
+def clean_isbn(value):
+    return str(value or "").replace("-", "").replace(" ", "").upper()
+
+
+def to_isbn13(value):
+    """
+    Canonical ISBN-13 of an ISBN-10 or ISBN-13 in any notation, None when
+    the value is not a valid ISBN.
+    """
+    isbn = clean_isbn(value)
+    if isbnlib.is_isbn13(isbn):
+        return isbn
+    if isbnlib.is_isbn10(isbn):
+        return isbnlib.to_isbn13(isbn)
+    return None
+
+
+def is_valid_isbn(value):
+    isbn = clean_isbn(value)
+    return isbnlib.is_isbn10(isbn) or isbnlib.is_isbn13(isbn)
+
+
+def backfill_isbn13(using="default", batch_size=2000):
+    """
+    Fill isbn13 for rows stored before the column existed, see the
+    backfill_isbn13 command. A second notation of an already stored edition
+    is left empty and logged, the duplicate has to be merged by hand.
+    Returns the number of books filled.
+    """
+    from .models import Book
+
+    books = Book.objects.using(using)
+    last_pk = 0
+    filled = 0
+    while True:
+        batch = list(
+            books.filter(pk__gt=last_pk, isbn13__isnull=True)
+            .order_by("pk")
+            .only("pk", "isbn")[:batch_size]
+        )
+        if not batch:
+            return filled
+        last_pk = batch[-1].pk
+
+        candidates = {}
+        for book in batch:
+            isbn13 = to_isbn13(book.isbn)
+            if isbn13 in candidates:
+                logger.warning("Book %s duplicates ISBN %s", book.pk, isbn13)
+            elif isbn13:
+                candidates[isbn13] = book
+        taken = set(
+            books.filter(isbn13__in=candidates).values_list("isbn13", flat=True)
+        )
+
+        changed = []
+        for isbn13, book in candidates.items():
+            if isbn13 in taken:
+                logger.warning("Book %s duplicates ISBN %s", book.pk, isbn13)
+                continue
+            book.isbn13 = isbn13
+            changed.append(book)
+        filled += books.bulk_update(changed, ["isbn13"])
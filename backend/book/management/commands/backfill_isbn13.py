@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from book.isbn import backfill_isbn13
+
+
+class Command(BaseCommand):
+    help = "Fill the canonical isbn13 of books stored before it existed"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        filled = backfill_isbn13(
+            using=options["database"], batch_size=options["batch_size"]
+        )
+        self.stdout.write(self.style.SUCCESS(f"Done, {filled} books updated"))
@@ -0,0 +1,105 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.http import QueryDict
+from rest_framework.exceptions import ValidationError
+
+from book.columnar import INDEXED_FILTERS, CatalogIndex, np
+from book.filters import BookFilter
+from book.models import Author, Book, Genre
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare random browse filter combinations answered by BookFilter "
+        "in SQL and by the in-process columnar index"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=200)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        if np is None:
+            raise CommandError("numpy is required for the columnar index")
+
+        started = time.perf_counter()
+        index = CatalogIndex()
+        index.rebuild()
+        index.max_ids = float("inf")
+        self.stdout.write(
+            f"Indexed {index.size} books in {time.perf_counter() - started:.2f}s"
+        )
+
+        rng = random.Random(options["seed"])
+        choices = self.choices()
+        sql_times, index_times, mismatches = [], [], 0
+        for _ in range(options["runs"]):
+            params = self.random_params(rng, choices)
+            filterset = BookFilter(params, queryset=Book.objects.all())
+            if not filterset.is_valid():
+                continue
+
+            started = time.perf_counter()
+            try:
+                expected = set(filterset.qs.values_list("pk", flat=True))
+            except ValidationError:
+                continue
+            sql_times.append(time.perf_counter() - started)
+
+            values = {
+                name: value
+                for name, value in filterset.form.cleaned_data.items()
+                if value not in (None, "") and name in INDEXED_FILTERS
+            }
+            started = time.perf_counter()
+            found = set(index.match(values).tolist())
+            index_times.append(time.perf_counter() - started)
+
+            if found != expected:
+                mismatches += 1
+                self.stderr.write(f"Results differ for {params.urlencode()}")
+
+        if not sql_times:
+            raise CommandError("No valid filter combinations, is the catalog empty?")
+
+        for name, timings in (("sql", sql_times), ("columnar", index_times)):
+            timings.sort()
+            self.stdout.write(
+                f"{name:>9}: median {timings[len(timings) // 2] * 1000:.2f}ms, "
+                f"p95 {timings[int(len(timings) * 0.95)] * 1000:.2f}ms"
+            )
+        style = self.style.ERROR if mismatches else self.style.SUCCESS
+        self.stdout.write(style(f"{len(sql_times)} queries, {mismatches} mismatches"))
+
+    def choices(self):
+        dates = list(
+            Book.objects.filter(published_at__isnull=False)
+            .order_by("?")
+            .values_list("published_at", flat=True)[:100]
+        )
+        return {
+            "genres__name": list(Genre.objects.values_list("name", flat=True)),
+            "language": list(
+                Book.objects.values_list("language", flat=True).distinct()
+            ),
+            "authors__name__icontains": [
+                name[:3]
+                for name in Author.objects.order_by("?").values_list("name", flat=True)[
+                    :100
+                ]
+                if len(name) >= 3
+            ],
+            "published_after": dates,
+            "published_before": dates,
+            "min_pages": range(0, 800, 50),
+            "max_pages": range(100, 1200, 50),
+        }
+
+    def random_params(self, rng, choices):
+        params = QueryDict(mutable=True)
+        available = [name for name, values in choices.items() if values]
+        for name in rng.sample(available, rng.randint(1, min(3, len(available)))):
+            params[name] = str(rng.choice(choices[name]))
+        return params
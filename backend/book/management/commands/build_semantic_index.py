@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from book.semantic import build_index, index_directory, np
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the LSA vectors and the nearest neighbour index behind "
+        "?semantic= book searches"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dimensions", type=int, default=128)
+        parser.add_argument("--min-df", type=int, default=2)
+        parser.add_argument("--max-df", type=float, default=0.5)
+        parser.add_argument("--max-terms", type=int, default=50000)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--output", help="Index directory (default: SEMANTIC_INDEX_DIR)"
+        )
+
+    def handle(self, *args, **options):
+        if np is None:
+            raise CommandError("numpy and scipy are required for the semantic index")
+
+        directory = options["output"] or index_directory()
+        try:
+            total = build_index(
+                directory,
+                dimensions=options["dimensions"],
+                min_df=options["min_df"],
+                max_df=options["max_df"],
+                max_terms=options["max_terms"],
+                batch_size=options["batch_size"],
+                log=self.stdout.write,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} books in {directory}"))
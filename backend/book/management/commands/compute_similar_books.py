@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from book.similarity import (
+    FEATURE_WEIGHTS,
+    incidence_matrix,
+    np,
+    store_neighbours,
+    top_neighbours,
+)
+
+
+class Command(BaseCommand):
+    help = "Precompute the top-k similar books of every book from shared relations"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top-k", type=int, default=20)
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--max-feature-books", type=int, default=5000)
+        for name, weight in FEATURE_WEIGHTS.items():
+            parser.add_argument(f"--{name}-weight", type=float, default=weight)
+
+    def handle(self, *args, **options):
+        if np is None:
+            raise CommandError("numpy and scipy are required to compute similarities")
+
+        weights = {name: options[f"{name}_weight"] for name in FEATURE_WEIGHTS}
+        book_ids, matrix = incidence_matrix(weights, options["max_feature_books"])
+        self.stdout.write(
+            f"Built a {matrix.shape[0]}x{matrix.shape[1]} matrix "
+            f"with {matrix.nnz} entries"
+        )
+
+        batch_size = options["batch_size"]
+        for start in range(0, len(book_ids), batch_size):
+            stop = min(start + batch_size, len(book_ids))
+            store_neighbours(
+                list(top_neighbours(book_ids, matrix, start, stop, options["top_k"]))
+            )
+            self.stdout.write(f"Stored neighbours of {stop} books")
+
+        self.stdout.write(self.style.SUCCESS("Done"))
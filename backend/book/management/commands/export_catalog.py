@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from book.export import EXPORT_FORMATS, iter_catalog
+
+
+class Command(BaseCommand):
+    help = "Stream the whole catalog with its relations as NDJSON or CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--format", choices=sorted(EXPORT_FORMATS), default="ndjson"
+        )
+        parser.add_argument("--output", help="Output file (default: stdout)")
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        render, _ = EXPORT_FORMATS[options["format"]]
+        rows = render(iter_catalog(chunk_size=options["chunk_size"]))
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8", newline="") as fp:
+                fp.writelines(rows)
+        else:
+            for line in rows:
+                self.stdout.write(line, ending="")
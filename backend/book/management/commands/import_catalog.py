@@ -0,0 +1,78 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from book.catalog_import import CatalogImporter, iter_json_array
+
+SOURCES = [
+    ("authors", "author.json", "authors"),
+    ("publishers", "publisher.json", "publishers"),
+    ("genres", "genre.json", "book_categories"),
+    ("books", "book.json", "editions"),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Import the Hardcover JSON dumps written by scripts/getData.py. "
+        "Safe to rerun: rows are upserted by name / ISBN."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dir",
+            default=".",
+            help="Directory containing author/publisher/genre/book.json",
+        )
+        for kind, filename, _ in SOURCES:
+            parser.add_argument(
+                f"--{kind}", help=f"Path to the {kind} dump (default: {filename})"
+            )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--limit", type=int, help="Import at most this many books")
+        parser.add_argument(
+            "--seed-relations",
+            action="store_true",
+            help=(
+                "Assign pseudo random authors, genres and publishers (stable per "
+                "ISBN) to books whose record has none, for development data"
+            ),
+        )
+        parser.add_argument(
+            "--rejects", help="Write rejected rows to this file as NDJSON"
+        )
+
+    def handle(self, *args, **options):
+        importer = CatalogImporter(
+            batch_size=options["batch_size"],
+            seed_relations=options["seed_relations"],
+            progress=self.stdout.write,
+        )
+
+        for kind, filename, key in SOURCES:
+            path = Path(options[kind] or Path(options["dir"]) / filename)
+            if not path.exists():
+                if options[kind]:
+                    raise CommandError(f"{path} does not exist")
+                self.stdout.write(f"Skipping {kind}, {path} not found")
+                continue
+
+            with open(path, encoding="utf-8") as fp:
+                items = iter_json_array(fp, key)
+                if kind == "books" and options["limit"]:
+                    items = (item for _, item in zip(range(options["limit"]), items))
+                getattr(importer, f"import_{kind}")(items)
+
+        report = importer.report
+        if options["rejects"] and report.rejected:
+            with open(options["rejects"], "w", encoding="utf-8") as fp:
+                for row in report.rejected:
+                    fp.write(json.dumps(row, default=str) + "\n")
+
+        summary = ", ".join(f"{count} {kind}" for kind, count in report.created.items())
+        self.stdout.write(self.style.SUCCESS(f"Imported {summary or 'nothing'}"))
+        if report.rejected:
+            self.stdout.write(
+                self.style.WARNING(f"Rejected {len(report.rejected)} rows")
+            )
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from book.models import Book
+from book.search import update_search_vector
+
+
+class Command(BaseCommand):
+    help = "Recompute the stored full text search vector of every book"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument(
+            "--missing-only",
+            action="store_true",
+            help="Only fill books that have no search vector yet",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        queryset = Book.objects.order_by("pk")
+        if options["missing_only"]:
+            queryset = queryset.filter(search_vector__isnull=True)
+
+        last_pk = 0
+        updated = 0
+        while True:
+            ids = list(
+                queryset.filter(pk__gt=last_pk).values_list("pk", flat=True)[
+                    :batch_size
+                ]
+            )
+            if not ids:
+                break
+
+            updated += update_search_vector(ids)
+            last_pk = ids[-1]
+            self.stdout.write(f"Updated {updated} books")
+
+        self.stdout.write(self.style.SUCCESS(f"Done, {updated} books updated"))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from book.counters import (
+    engagement_counts,
+    rating_counts,
+    reconcile_counters,
+    refresh_rating_scores,
+)
+from book.models import Book
+
+
+class Command(BaseCommand):
+    help = "Recompute denormalized book counters and repair drifted rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+
+        last_pk = 0
+        checked = repaired = 0
+        while True:
+            ids = list(
+                Book.objects.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+
+            # separate passes, joining shelves and reviews at once would
+            # multiply the rows being counted
+            repaired += reconcile_counters(ids, engagement_counts())
+            repaired += reconcile_counters(ids, rating_counts())
+            refresh_rating_scores(ids)
+            checked += len(ids)
+            last_pk = ids[-1]
+            self.stdout.write(f"Checked {checked} books, repaired {repaired}")
+
+        self.stdout.write(self.style.SUCCESS(f"Done, {repaired} books repaired"))
@@ -1,4 +1,9 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models.functions import Collate, Lower
+
+from .isbn import to_isbn13
 
 # Create your models here.
 
@@ -11,6 +16,11 @@ class Author(models.Model):
     class Meta:
         indexes = [
             models.Index(fields=["name"]),
+            # autocomplete, see book.search.autocomplete
+            models.Index(
+                Collate(Lower("name"), "C"),
+                name="author_name_prefix_idx",
+            ),
         ]
 
     def __str__(self):
@@ -29,11 +39,40 @@ class Publisher(models.Model):
 class Genre(models.Model):
     name = models.CharField(max_length=100, unique=True, db_index=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                Collate(Lower("name"), "C"),
+                name="genre_name_prefix_idx",
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
 
 class Book(models.Model):
+    # prior used by the bayesian rating, an unrated book scores the prior mean
+    RATING_PRIOR_MEAN = 3.0
+    RATING_PRIOR_WEIGHT = 5
+
+    # denormalized engagement and rating columns, see book.counters
+    COUNTER_FIELDS = (
+        "readers_count",
+        "want_to_read_count",
+        "currently_reading_count",
+        "read_count",
+        "rating_count",
+        "rating_sum",
+        "rating_1",
+        "rating_2",
+        "rating_3",
+        "rating_4",
+        "rating_5",
+        "rating_average",
+        "rating_bayesian",
+    )
+
     title = models.CharField(max_length=255, db_index=True)
     description = models.TextField(blank=True, null=True)
     authors = models.ManyToManyField(Author)
@@ -41,6 +80,8 @@ class Book(models.Model):
     genres = models.ManyToManyField(Genre)
 
     isbn = models.CharField(max_length=17, unique=True)
+    # canonical form of `isbn`, filled in save()
+    isbn13 = models.CharField(max_length=13, unique=True, null=True, editable=False)
 
     published_at = models.DateField(null=True, blank=True, db_index=True)
     publishers = models.ManyToManyField(Publisher)
@@ -50,5 +91,104 @@ class Book(models.Model):
 
     cover_image = models.URLField(blank=True, null=True)
 
+    # also moved by queryset updates in book.signals (not by the counters
+    # below), conditional GETs use it as the version of the book and the
+    # in-process indexes to catch up with writes from other processes
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    # engagement counters maintained from shelf changes, see book.counters
+    readers_count = models.PositiveIntegerField(default=0, editable=False)
+    want_to_read_count = models.PositiveIntegerField(default=0, editable=False)
+    currently_reading_count = models.PositiveIntegerField(default=0, editable=False)
+    read_count = models.PositiveIntegerField(default=0, editable=False)
+
+    # rating summary maintained from review changes, see book.counters
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_1 = models.PositiveIntegerField(default=0, editable=False)
+    rating_2 = models.PositiveIntegerField(default=0, editable=False)
+    rating_3 = models.PositiveIntegerField(default=0, editable=False)
+    rating_4 = models.PositiveIntegerField(default=0, editable=False)
+    rating_5 = models.PositiveIntegerField(default=0, editable=False)
+    rating_average = models.FloatField(null=True, editable=False)
+    rating_bayesian = models.FloatField(default=RATING_PRIOR_MEAN, editable=False)
+
+    # maintained by book.search, see update_search_vector
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=["search_vector"], name="book_search_vector_gin"),
+            # keyset pagination, see book.pagination.BookCursorPagination
+            models.Index(fields=["title", "id"], name="book_title_id_idx"),
+            models.Index(
+                fields=["published_at", "id"], name="book_published_id_idx"
+            ),
+            models.Index(fields=["page_count", "id"], name="book_pages_id_idx"),
+            models.Index(
+                fields=["readers_count", "id"], name="book_readers_id_idx"
+            ),
+            models.Index(
+                fields=["rating_bayesian", "id"], name="book_rating_id_idx"
+            ),
+            models.Index(
+                Collate(Lower("title"), "C"),
+                name="book_title_prefix_idx",
+            ),
+        ]
+
     def __str__(self):
         return self.title
+
+    def save(self, *args, **kwargs):
+        self.isbn13 = to_isbn13(self.isbn)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            if "isbn" in update_fields:
+                kwargs["update_fields"] = {*update_fields, "isbn13"}
+        elif not self._state.adding and not kwargs.get("force_insert"):
+            # the counters and the search vector are moved with queryset
+            # updates, writing back this instance's copies would undo the
+            # ones that happened since it was loaded
+            kwargs["update_fields"] = self.editable_update_fields()
+        super().save(*args, **kwargs)
+
+    def editable_update_fields(self):
+        skipped = {*self.COUNTER_FIELDS, "search_vector"}
+        deferred = self.get_deferred_fields()
+        return [
+            field.name
+            for field in self._meta.concrete_fields
+            if not field.primary_key
+            and field.name not in skipped
+            and field.attname not in deferred
+        ]
+
+    @property
+    def rating_histogram(self):
+        return {star: getattr(self, f"rating_{star}") for star in range(1, 6)}
+
+
+class SimilarBook(models.Model):
+    """Precomputed "more like this" neighbours, see book.similarity."""
+
+    book = models.ForeignKey(
+        Book, on_delete=models.CASCADE, related_name="similar_books"
+    )
+    similar = models.ForeignKey(
+        Book, on_delete=models.CASCADE, related_name="similar_to"
+    )
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["book", "similar"], name="unique_similar_book"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["book", "-score"], name="similar_book_score_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.similar_id} similar to {self.book_id} ({self.score:.3f})"
@@ -0,0 +1,174 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from rest_framework.exceptions import NotFound
+from rest_framework.exceptions import ValidationError as RequestValidationError
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class BookCursorPagination(BasePagination):
+    """
+    Keyset pagination over (ordering field, pk).
+
+    Each page seeks straight to the last seen key through the composite
+    (field, id) indexes on Book, so deep pages cost the same as the first
+    one and no COUNT is ever issued. Nullable fields keep Postgres' default
+    placement (NULLS LAST ascending, NULLS FIRST descending) so a single
+    ascending index serves both directions. Any other order, search
+    relevance included, is rejected instead of being replaced by the
+    default one.
+    """
+
+    cursor_query_param = "cursor"
+    ordering_param = "ordering"
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering_fields = (
+        "title",
+        "published_at",
+        "page_count",
+        "readers_count",
+        "rating_bayesian",
+    )
+    default_ordering = "title"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.field_name, self.descending = self.get_ordering(request)
+        if (
+            request.query_params.get(self.ordering_param) is None
+            and "search_rank" in queryset.query.annotations
+        ):
+            raise RequestValidationError(
+                {
+                    self.ordering_param: "Search results are ordered by relevance, "
+                    "which cursor pagination cannot follow. Pass one of "
+                    f"{', '.join(self.ordering_fields)} or use page numbers."
+                }
+            )
+        field = queryset.model._meta.get_field(self.field_name)
+        position = self.decode_cursor(request, field)
+
+        segments = [False, True] if field.null else [False]
+        if self.descending:
+            segments.reverse()
+        if position is not None:
+            start = segments.index(position[0] is None)
+            segments = segments[start:]
+
+        results = []
+        for is_null in segments:
+            limit = self.page_size + 1 - len(results)
+            if limit <= 0:
+                break
+            segment = self.get_segment(queryset, is_null, position)
+            results.extend(segment[:limit])
+            position = None
+
+        self.has_next = len(results) > self.page_size
+        self.page = results[: self.page_size]
+        return self.page
+
+    def get_segment(self, queryset, is_null, position):
+        name = self.field_name
+        prefix = "-" if self.descending else ""
+        queryset = queryset.filter(**{f"{name}__isnull": is_null})
+
+        if position is not None:
+            value, pk = position
+            if is_null:
+                lookup = "pk__lt" if self.descending else "pk__gt"
+                queryset = queryset.filter(**{lookup: pk})
+            elif self.descending:
+                # the leading range condition lets the index seek to the key
+                queryset = queryset.filter(**{f"{name}__lte": value}).exclude(
+                    **{name: value, "pk__gte": pk}
+                )
+            else:
+                queryset = queryset.filter(**{f"{name}__gte": value}).exclude(
+                    **{name: value, "pk__lte": pk}
+                )
+
+        return queryset.order_by(f"{prefix}{name}", f"{prefix}pk")
+
+    def get_ordering(self, request):
+        ordering = request.query_params.get(self.ordering_param)
+        if ordering is None:
+            return self.default_ordering, False
+
+        ordering = ordering.strip()
+        name = ordering.lstrip("-")
+        if name not in self.ordering_fields:
+            raise RequestValidationError(
+                {
+                    self.ordering_param: "Cursor pagination orders by one of "
+                    f"{', '.join(self.ordering_fields)}, optionally reversed "
+                    "with a leading '-'."
+                }
+            )
+        return name, ordering.startswith("-")
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size,
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def decode_cursor(self, request, field):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            value, pk = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            if value is not None:
+                value = field.to_python(value)
+            return value, int(pk)
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, instance):
+        value = getattr(instance, self.field_name)
+        if value is not None and not isinstance(value, (str, int)):
+            value = value.isoformat()
+        payload = json.dumps([value, instance.pk]).encode()
+        return base64.urlsafe_b64encode(payload).decode()
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.page[-1])
+        )
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                [
+                    ("next", self.get_next_link()),
+                    ("results", data),
+                ]
+            )
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
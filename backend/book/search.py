@@ -0,0 +1,153 @@
+import logging
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    TrigramWordSimilarity,
+)
+from django.db import DatabaseError, connection, connections, transaction
+from django.db.models import F, OuterRef, Subquery, TextField, Value
+from django.db.models.functions import Coalesce, Collate, Lower
+
+from .models import Author, Book, Genre
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CONFIG = "english"
+TRIGRAM_INDEX_NAME = "book_title_trgm"
+
+AUTOCOMPLETE_SOURCES = {
+    "books": (Book, "title"),
+    "authors": (Author, "name"),
+    "genres": (Genre, "name"),
+}
+
+_trigram_available = None
+
+
+def _related_names(through, field):
+    return Coalesce(
+        Subquery(
+            through.objects.filter(book=OuterRef("pk"))
+            .values("book")
+            .annotate(names=StringAgg(f"{field}__name", delimiter=" "))
+            .values("names")
+        ),
+        Value(""),
+        output_field=TextField(),
+    )
+
+
+def build_search_vector():
+    """
+    Weighted document: title and ISBN rank highest, then author names,
+    genre names and finally the description.
+    """
+    return (
+        SearchVector("title", weight="A", config=SEARCH_CONFIG)
+        + SearchVector("isbn", weight="A", config="simple")
+        + SearchVector(
+            _related_names(Book.authors.through, "author"),
+            weight="B",
+            config=SEARCH_CONFIG,
+        )
+        + SearchVector(
+            _related_names(Book.genres.through, "genre"),
+            weight="C",
+            config=SEARCH_CONFIG,
+        )
+        + SearchVector(
+            Coalesce("description", Value(""), output_field=TextField()),
+            weight="D",
+            config=SEARCH_CONFIG,
+        )
+    )
+
+
+def update_search_vector(book_ids):
+    book_ids = list(book_ids)
+    if not book_ids:
+        return 0
+    return Book.objects.filter(pk__in=book_ids).update(
+        search_vector=build_search_vector()
+    )
+
+
+def trigram_available():
+    global _trigram_available
+
+    if _trigram_available is None:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            _trigram_available = cursor.fetchone() is not None
+
+    return _trigram_available
+
+
+def ensure_trigram_index(using="default", **kwargs):
+    """
+    post_migrate hook: the typo fallback needs pg_trgm and a trigram index
+    on the title. Missing extension only disables the fallback.
+    """
+    global _trigram_available
+
+    try:
+        with transaction.atomic(using=using):
+            with connections[using].cursor() as cursor:
+                cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+                cursor.execute(
+                    f"CREATE INDEX IF NOT EXISTS {TRIGRAM_INDEX_NAME} "
+                    f"ON {Book._meta.db_table} USING gin (title gin_trgm_ops)"
+                )
+    except DatabaseError:
+        logger.warning("pg_trgm is not available, typo fallback is disabled")
+        _trigram_available = False
+    else:
+        _trigram_available = True
+
+
+def search_books(queryset, text):
+    """
+    Full text search ranked by ts_rank. When nothing matches, fall back to
+    trigram similarity on the title so simple typos still find the book.
+    """
+    query = SearchQuery(text, search_type="websearch", config=SEARCH_CONFIG)
+    results = queryset.filter(search_vector=query).annotate(
+        search_rank=SearchRank(F("search_vector"), query)
+    )
+
+    if not trigram_available() or results.exists():
+        return results.order_by("-search_rank", "pk")
+
+    return (
+        queryset.filter(title__trigram_word_similar=text)
+        .annotate(search_rank=TrigramWordSimilarity(text, "title"))
+        .order_by("-search_rank", "pk")
+    )
+
+
+def autocomplete(prefix, limit=10, sources=AUTOCOMPLETE_SOURCES):
+    """
+    Id and label of the first `limit` titles and names starting with
+    `prefix`, case insensitive. Both LOWER(column) COLLATE "C" LIKE 'prefix%'
+    and the ORDER BY on it are answered by the C collated expression indexes
+    (text_pattern_ops would only serve the LIKE), so the scan stops after
+    `limit` rows.
+    """
+    prefix = prefix.strip().lower()
+    suggestions = {}
+    for name in sources:
+        model, field = AUTOCOMPLETE_SOURCES[name]
+        if not prefix:
+            suggestions[name] = []
+            continue
+        rows = (
+            model.objects.alias(label=Collate(Lower(field), "C"))
+            .filter(label__startswith=prefix)
+            .order_by("label", "pk")
+            .values_list("pk", field)[:limit]
+        )
+        suggestions[name] = [{"id": pk, "label": label} for pk, label in rows]
+    return suggestions
@@ -0,0 +1,320 @@
+import json
+import os
+import shutil
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+try:
+    import numpy as np
+    from scipy import sparse
+    from scipy.sparse.linalg import svds
+except ImportError:  # optional, ?semantic= falls back to full text search
+    np = sparse = svds = None
+
+from .caching import get_generations
+from .indexes import InProcessIndex
+from .models import Book
+from .spelling import words
+
+VECTORS_FILE = "vectors.npy"
+IDS_FILE = "ids.npy"
+LISTS_FILE = "lists.npz"
+MODEL_FILE = "model.npz"
+META_FILE = "meta.json"
+
+
+def index_directory():
+    return Path(settings.SEMANTIC_INDEX_DIR)
+
+
+def document_words(title, description):
+    # the title is short but says the most, count its words twice
+    return words(title) * 2 + words(description)
+
+
+def _iter_documents(batch_size):
+    last_pk = 0
+    while True:
+        rows = list(
+            Book.objects.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .values_list("pk", "title", "description")[:batch_size]
+        )
+        if not rows:
+            return
+        for pk, title, description in rows:
+            yield pk, document_words(title, description)
+        last_pk = rows[-1][0]
+
+
+def tfidf_rows(documents, terms, idf):
+    """L2 normalized, sublinear tf-idf rows of `documents` (lists of words)."""
+    rows, columns, values = [], [], []
+    for row, document in enumerate(documents):
+        counts = Counter(terms[word] for word in document if word in terms)
+        for column, count in counts.items():
+            rows.append(row)
+            columns.append(column)
+            values.append((1 + np.log(count)) * idf[column])
+
+    matrix = sparse.csr_matrix(
+        (values, (rows, columns)), shape=(len(documents), len(idf)), dtype=np.float32
+    )
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms) @ matrix
+
+
+def normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return (vectors / norms).astype(np.float32)
+
+
+def spherical_kmeans(vectors, clusters, iterations=10, sample=50000, seed=0):
+    """Unit length centroids of `clusters` groups of (unit) `vectors`."""
+    rng = np.random.default_rng(seed)
+    if len(vectors) > sample:
+        vectors = vectors[rng.choice(len(vectors), sample, replace=False)]
+    centroids = vectors[rng.choice(len(vectors), clusters, replace=False)]
+
+    for _ in range(iterations):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        empty = np.bincount(assignments, minlength=clusters) == 0
+        # an empty cluster restarts from a random vector
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+        centroids = normalize(sums)
+    return centroids
+
+
+def build_index(
+    directory,
+    dimensions=128,
+    min_df=2,
+    max_df=0.5,
+    max_terms=50000,
+    batch_size=5000,
+    log=lambda message: None,
+):
+    """
+    Offline LSA pipeline: tf-idf of titles and descriptions, truncated SVD
+    down to `dimensions` and an inverted file (IVF) over the unit length
+    book vectors. The vectors are written grouped by list so a query reads
+    a few contiguous slices of the memory-mapped matrix.
+    """
+    built_at = timezone.now()
+    document_frequency = Counter()
+    total = 0
+    for _, document in _iter_documents(batch_size):
+        document_frequency.update(set(document))
+        total += 1
+
+    vocabulary = [
+        word
+        for word, count in document_frequency.most_common()
+        if count >= min_df and count <= max_df * total
+    ][:max_terms]
+    terms = {word: column for column, word in enumerate(vocabulary)}
+    idf = np.array(
+        [
+            np.log((1 + total) / (1 + document_frequency[word])) + 1
+            for word in vocabulary
+        ],
+        dtype=np.float32,
+    )
+    log(f"{total} books, {len(vocabulary)} terms")
+
+    ids, blocks, documents = [], [], []
+    for pk, document in _iter_documents(batch_size):
+        ids.append(pk)
+        documents.append(document)
+        if len(documents) >= batch_size:
+            blocks.append(tfidf_rows(documents, terms, idf))
+            documents = []
+    if documents:
+        blocks.append(tfidf_rows(documents, terms, idf))
+
+    dimensions = min(dimensions, total - 1, len(vocabulary) - 1)
+    if not blocks or dimensions < 1:
+        raise ValueError("Not enough books with descriptions to build the index")
+
+    matrix = sparse.vstack(blocks).tocsr()
+    _, _, components = svds(matrix, k=dimensions)
+    components = components.T.astype(np.float32)
+    vectors = normalize(matrix @ components)
+    ids = np.array(ids, dtype=np.int64)
+    log(f"Reduced to {dimensions} dimensions")
+
+    lists = max(1, min(int(np.sqrt(total)), total))
+    centroids = spherical_kmeans(vectors, lists)
+    assignments = np.concatenate(
+        [
+            np.argmax(vectors[start : start + batch_size] @ centroids.T, axis=1)
+            for start in range(0, total, batch_size)
+        ]
+    )
+    order = np.argsort(assignments, kind="stable")
+    offsets = np.searchsorted(assignments[order], np.arange(lists + 1))
+    log(f"Grouped into {lists} lists")
+
+    staging = Path(f"{directory}.tmp")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+    np.save(staging / VECTORS_FILE, vectors[order])
+    np.save(staging / IDS_FILE, ids[order])
+    np.savez(staging / LISTS_FILE, centroids=centroids, offsets=offsets)
+    np.savez(
+        staging / MODEL_FILE,
+        terms=np.array(vocabulary, dtype=str),
+        idf=idf,
+        components=components,
+    )
+    (staging / META_FILE).write_text(
+        json.dumps(
+            {"built_at": built_at.isoformat(), "books": total, "dimensions": dimensions}
+        )
+    )
+
+    previous = Path(f"{directory}.old")
+    shutil.rmtree(previous, ignore_errors=True)
+    if Path(directory).exists():
+        os.rename(directory, previous)
+    os.rename(staging, directory)
+    shutil.rmtree(previous, ignore_errors=True)
+    return total
+
+
+class SemanticIndex(InProcessIndex):
+    """
+    Query side of the LSA index written by build_index(). The book vectors
+    stay memory-mapped, a query embeds the text with the stored model,
+    ranks the list centroids and scores only the books of the `probes`
+    closest lists.
+
+    Books added or edited after the build are folded in with the same
+    model and kept in memory next to the file, their stored vectors are
+    ignored from then on.
+    """
+
+    probes = 8
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.mtime = os.stat(self.directory / META_FILE).st_mtime
+        super().__init__()
+
+    def _reset(self):
+        self.vectors = np.load(self.directory / VECTORS_FILE, mmap_mode="r")
+        self.ids = np.load(self.directory / IDS_FILE)
+        with np.load(self.directory / LISTS_FILE) as lists:
+            self.centroids, self.offsets = lists["centroids"], lists["offsets"]
+        with np.load(self.directory / MODEL_FILE) as model:
+            self.terms = {word: column for column, word in enumerate(model["terms"])}
+            self.idf, self.components = model["idf"], model["components"]
+        meta = json.loads((self.directory / META_FILE).read_text())
+        self.built_at = parse_datetime(meta["built_at"])
+
+        self.folded = {}
+        self.folded_ids = self.folded_vectors = None
+
+    def _load_names(self):
+        pass
+
+    def rebuild(self):
+        with self.lock:
+            started = timezone.now()
+            generations = get_generations(self.TRACKED)
+            self._reset()
+            self.refresh(
+                Book.objects.filter(
+                    updated_at__gte=self.built_at - self.sync_overlap
+                ).values_list("pk", flat=True)
+            )
+            self.generations, self.synced_at = generations, started
+
+    def _refresh(self, book_ids):
+        rows = list(
+            Book.objects.filter(pk__in=book_ids).values_list(
+                "pk", "title", "description"
+            )
+        )
+        # deleted books are shadowed by an empty vector
+        self.folded.update({pk: None for pk in book_ids})
+        if rows:
+            vectors = self.embed(
+                [document_words(title, description) for _, title, description in rows]
+            )
+            self.folded.update({pk: vector for (pk, *_), vector in zip(rows, vectors)})
+        self.folded_ids = self.folded_vectors = None
+
+    def embed(self, documents):
+        return normalize(tfidf_rows(documents, self.terms, self.idf) @ self.components)
+
+    def _folded(self):
+        if self.folded_ids is None:
+            live = [
+                (pk, vector) for pk, vector in self.folded.items() if vector is not None
+            ]
+            self.folded_ids = np.array([pk for pk, _ in live], dtype=np.int64)
+            self.folded_vectors = (
+                np.stack([vector for _, vector in live])
+                if live
+                else np.zeros((0, self.components.shape[1]), dtype=np.float32)
+            )
+        return self.folded_ids, self.folded_vectors
+
+    def search(self, text, limit=100):
+        """(book id, cosine similarity) of the closest books, best first."""
+        query = self.embed([words(text)])[0]
+        if not query.any():
+            return []
+
+        with self.lock:
+            probes = min(self.probes, len(self.centroids))
+            closest = np.argpartition(-(self.centroids @ query), probes - 1)[:probes]
+            ids = [self.ids[self.offsets[n] : self.offsets[n + 1]] for n in closest]
+            scores = [
+                self.vectors[self.offsets[n] : self.offsets[n + 1]] @ query
+                for n in closest
+            ]
+            ids, scores = np.concatenate(ids), np.concatenate(scores)
+            if self.folded:
+                current = ~np.isin(ids, np.fromiter(self.folded, dtype=np.int64))
+                folded_ids, folded_vectors = self._folded()
+                ids = np.concatenate([ids[current], folded_ids])
+                scores = np.concatenate([scores[current], folded_vectors @ query])
+
+        if len(scores) > limit:
+            best = np.argpartition(-scores, limit - 1)[:limit]
+            ids, scores = ids[best], scores[best]
+        order = np.argsort(-scores, kind="stable")
+        return [(int(pk), float(score)) for pk, score in zip(ids[order], scores[order])]
+
+
+_index = None
+
+
+def get_semantic_index():
+    """
+    The process-wide index, loaded on first use and again whenever the
+    build_semantic_index command replaced the files. None when it has not
+    been built or numpy and scipy are missing.
+    """
+    global _index
+    if np is None:
+        return None
+    directory = index_directory()
+    try:
+        mtime = os.stat(directory / META_FILE).st_mtime
+    except OSError:
+        return None
+    if _index is None or _index.directory != directory or _index.mtime != mtime:
+        _index = SemanticIndex(directory)
+    _index.sync()
+    return _index
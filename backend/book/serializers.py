@@ -1,9 +1,45 @@
 from rest_framework import serializers
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from rest_framework.validators import UniqueValidator
 from django.utils import timezone
 from django.core.validators import URLValidator
 
+from .caching import (
+    BOOK_CARD_TIMEOUT,
+    book_card_keys,
+    books_changed,
+    bump_generation,
+    with_counters,
+)
+from .indexes import refresh_books
+from .isbn import clean_isbn, is_valid_isbn, to_isbn13
 from .models import Book, Author, Genre, Publisher
+from .search import update_search_vector
+
+
+class DynamicFieldsMixin:
+    """
+    Accepts `fields` (sparse fieldset) and `expand` (relations to render
+    with their full serializer) keyword arguments.
+    """
+
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop("fields", None)
+        expand = kwargs.pop("expand", None) or ()
+        super().__init__(*args, **kwargs)
+        self.is_default_representation = fields is None and not expand
+
+        for name in expand:
+            if name in self.expandable_fields and name in self.fields:
+                self.fields[name] = self.expandable_fields[name]()
+
+        if fields is not None:
+            for name in set(self.fields) - set(fields) - {"id"}:
+                self.fields.pop(name)
 
 
 class AuthorSerializer(serializers.ModelSerializer):
@@ -61,12 +97,265 @@ class PublisherSerializer(serializers.ModelSerializer):
         return value
 
 
-class BookSerializer(serializers.ModelSerializer):
+class AuthorSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Author
+        fields = ["id", "name"]
+
+
+class PublisherSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Publisher
+        fields = ["id", "name"]
+
+
+class BookCardListSerializer(serializers.ListSerializer):
+    """
+    Assembles lists of default book cards from the fragment cache and only
+    loads relations for and serializes the books that missed.
+    """
+
+    def to_representation(self, data):
+        if not self.child.is_default_representation:
+            return super().to_representation(data)
+
+        books = list(data.all() if isinstance(data, models.Manager) else data)
+        keys = book_card_keys(book.pk for book in books)
+        cards = cache.get_many(list(keys.values()))
+
+        misses = [book for book in books if keys[book.pk] not in cards]
+        if misses:
+            prefetch_related_objects(
+                misses,
+                *[
+                    self.child.summary_prefetch(name)
+                    for name in ("authors", "genres", "publishers")
+                ],
+            )
+            fresh = {
+                keys[book.pk]: self.child.to_representation(book) for book in misses
+            }
+            cache.set_many(fresh, BOOK_CARD_TIMEOUT)
+            cards.update(fresh)
+
+        # cached cards carry counters as of their rendering
+        return [with_counters(cards[keys[book.pk]], book) for book in books]
+
+
+class BookListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """
+    Compact representation for list pages: related objects as id + name and
+    a shortened description.
+    """
+
+    DESCRIPTION_LENGTH = 200
+
+    authors = AuthorSummarySerializer(many=True, read_only=True)
+    publishers = PublisherSummarySerializer(many=True, read_only=True)
+    genres = GenreSerializer(many=True, read_only=True)
+    description = serializers.SerializerMethodField()
+
+    expandable_fields = {
+        "authors": lambda: AuthorSerializer(many=True, read_only=True),
+        "publishers": lambda: PublisherSerializer(many=True, read_only=True),
+        "description": lambda: serializers.CharField(read_only=True),
+    }
+
+    class Meta:
+        model = Book
+        fields = [
+            "id",
+            "title",
+            "description",
+            "isbn",
+            "isbn13",
+            "published_at",
+            "page_count",
+            "language",
+            "cover_image",
+            "readers_count",
+            "rating_count",
+            "rating_average",
+            "authors",
+            "genres",
+            "publishers",
+        ]
+        list_serializer_class = BookCardListSerializer
+
+    @staticmethod
+    def summary_prefetch(name):
+        model = Book._meta.get_field(name).related_model
+        return Prefetch(name, queryset=model.objects.only("id", "name"))
+
+    def get_description(self, obj):
+        if hasattr(obj, "description_preview"):
+            return obj.description_preview
+        if obj.description is None:
+            return None
+        return obj.description[: self.DESCRIPTION_LENGTH]
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Resolves ids against the objects BookBulkSerializer loaded with one
+    query per relation, falling back to a lookup per id otherwise.
+    """
+
+    def to_internal_value(self, data):
+        loaded = self.context.get("related_objects", {}).get(self.queryset.model)
+        if loaded is None:
+            return super().to_internal_value(data)
+
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            obj = loaded.get(int(data))
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        if obj is None:
+            self.fail("does_not_exist", pk_value=data)
+        return obj
+
+
+class BookBulkSerializer(serializers.ListSerializer):
+    """
+    List payload of BookSerializer: related ids and ISBN uniqueness are
+    checked with one query each for the whole batch, and books plus their
+    relation rows are written with bulk_create (bulk_update for a list of
+    existing books, matched to the items by "id") in one transaction.
+    """
+
+    relation_fields = {
+        "authors_ids": "authors",
+        "genres_ids": "genres",
+        "publishers_ids": "publishers",
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self.load_related(data)
+        if self.instance is not None:
+            self.instances_by_pk = {book.pk: book for book in self.instance}
+        return super().to_internal_value(data)
+
+    def load_related(self, data):
+        items = [item for item in data if isinstance(item, dict)]
+        related = {}
+        for field_name in self.relation_fields:
+            model = self.child.fields[field_name].child_relation.queryset.model
+            ids = set()
+            for item in items:
+                values = item.get(field_name)
+                if isinstance(values, list):
+                    ids.update(
+                        int(pk)
+                        for pk in values
+                        if isinstance(pk, int) or str(pk).isdigit()
+                    )
+            related[model] = model.objects.in_bulk(ids)
+
+        isbns = {to_isbn13(item.get("isbn")) for item in items} - {None}
+        self.context["related_objects"] = related
+        self.context["existing_isbn13"] = dict(
+            Book.objects.filter(isbn13__in=isbns).values_list("isbn13", "pk")
+        )
+
+    def run_child_validation(self, data):
+        # each item of an update is validated against the book it names
+        if self.instance is not None:
+            self.child.instance = self.instances_by_pk.get(data.get("id"))
+        return super().run_child_validation(data)
+
+    def validate(self, attrs):
+        seen = set()
+        for item in attrs:
+            if "isbn" not in item:
+                continue
+            isbn13 = to_isbn13(item["isbn"])
+            if isbn13 in seen:
+                raise serializers.ValidationError(
+                    f"ISBN {item['isbn']} appears more than once"
+                )
+            seen.add(isbn13)
+        return attrs
+
+    def create(self, validated_data):
+        relations = {}
+        books = []
+        for attrs in validated_data:
+            book_relations = {
+                name: attrs.pop(name, []) for name in self.relation_fields.values()
+            }
+            book = Book(**attrs)
+            book.isbn13 = to_isbn13(book.isbn)
+            books.append(book)
+            relations[id(book)] = book_relations
+
+        with transaction.atomic():
+            Book.objects.bulk_create(books)
+            for name in self.relation_fields.values():
+                through = getattr(Book, name).through
+                target = getattr(Book, name).field.m2m_reverse_field_name()
+                through.objects.bulk_create(
+                    through(book_id=book.pk, **{f"{target}_id": obj.pk})
+                    for book in books
+                    for obj in relations[id(book)][name]
+                )
+            book_ids = [book.pk for book in books]
+            update_search_vector(book_ids)
+            bump_generation(Book)
+            refresh_books(book_ids)
+
+        return books
+
+    def update(self, instances, validated_data):
+        relations = {}
+        fields = set()
+        now = timezone.now()
+        for book, attrs in zip(instances, validated_data):
+            relations[book.pk] = {
+                name: attrs.pop(name)
+                for name in self.relation_fields.values()
+                if name in attrs
+            }
+            for name, value in attrs.items():
+                setattr(book, name, value)
+            fields.update(attrs)
+            book.isbn13 = to_isbn13(book.isbn)
+            book.updated_at = now
+        if "isbn" in fields:
+            fields.add("isbn13")
+
+        book_ids = [book.pk for book in instances]
+        with transaction.atomic():
+            Book.objects.bulk_update(instances, [*fields, "updated_at"])
+            for name in self.relation_fields.values():
+                changed = {
+                    pk: objs[name] for pk, objs in relations.items() if name in objs
+                }
+                if not changed:
+                    continue
+                through = getattr(Book, name).through
+                target = getattr(Book, name).field.m2m_reverse_field_name()
+                through.objects.filter(book_id__in=changed).delete()
+                through.objects.bulk_create(
+                    through(book_id=pk, **{f"{target}_id": obj.pk})
+                    for pk, objs in changed.items()
+                    for obj in objs
+                )
+            update_search_vector(book_ids)
+            books_changed(book_ids)
+            refresh_books(book_ids)
+
+        return instances
+
+
+class BookSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     authors = AuthorSerializer(many=True, required=False)
     publishers = PublisherSerializer(many=True, required=False)
     genres = GenreSerializer(many=True, required=False)
 
-    authors_ids = serializers.PrimaryKeyRelatedField(
+    authors_ids = BulkPrimaryKeyRelatedField(
         queryset=Author.objects.all(),
         source="authors",
         many=True,
@@ -74,14 +363,14 @@ class BookSerializer(serializers.ModelSerializer):
         required=True,
     )
 
-    publishers_ids = serializers.PrimaryKeyRelatedField(
+    publishers_ids = BulkPrimaryKeyRelatedField(
         queryset=Publisher.objects.all(),
         source="publishers",
         many=True,
         write_only=True,
     )
 
-    genres_ids = serializers.PrimaryKeyRelatedField(
+    genres_ids = BulkPrimaryKeyRelatedField(
         queryset=Genre.objects.all(),
         source="genres",
         many=True,
@@ -91,6 +380,10 @@ class BookSerializer(serializers.ModelSerializer):
 
     language = serializers.CharField(max_length=30, required=False, default="English")
 
+    rating_histogram = serializers.DictField(
+        child=serializers.IntegerField(), read_only=True
+    )
+
     page_count = serializers.IntegerField(
         required=False,
         allow_null=True,
@@ -100,7 +393,17 @@ class BookSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Book
-        fields = "__all__"
+        exclude = [
+            "search_vector",
+            "rating_1",
+            "rating_2",
+            "rating_3",
+            "rating_4",
+            "rating_5",
+        ]
+        # uniqueness is checked on the canonical form in validate_isbn
+        extra_kwargs = {"isbn": {"validators": []}}
+        list_serializer_class = BookBulkSerializer
 
     def validate(self, attrs):
         published_at = attrs.get("published_at")
@@ -131,9 +434,7 @@ class BookSerializer(serializers.ModelSerializer):
         return attrs
 
     def validate_isbn(self, value):
-        import isbnlib
-
-        cleaned_isbn = value.replace("-", "").replace(" ", "")
+        cleaned_isbn = clean_isbn(value)
 
         if not cleaned_isbn.isdigit():
             raise serializers.ValidationError("ISBN must contain only digits")
@@ -141,9 +442,23 @@ class BookSerializer(serializers.ModelSerializer):
         if len(cleaned_isbn) not in [10, 13]:
             raise serializers.ValidationError("ISBN must be 10 or 13 digits long")
 
-        if not isbnlib.is_isbn10(cleaned_isbn) and not isbnlib.is_isbn13(cleaned_isbn):
+        if not is_valid_isbn(cleaned_isbn):
             raise serializers.ValidationError("Invalid ISBN checksum")
 
+        existing = self.context.get("existing_isbn13")
+        if existing is not None:
+            owner = existing.get(to_isbn13(cleaned_isbn))
+            duplicate = owner is not None and (
+                self.instance is None or owner != self.instance.pk
+            )
+        else:
+            duplicates = Book.objects.filter(isbn13=to_isbn13(cleaned_isbn))
+            if self.instance is not None:
+                duplicates = duplicates.exclude(pk=self.instance.pk)
+            duplicate = duplicates.exists()
+        if duplicate:
+            raise serializers.ValidationError("book with this isbn already exists.")
+
         return cleaned_isbn
 
     def create(self, validated_data):
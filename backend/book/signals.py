@@ -0,0 +1,116 @@
+from django.db.models.functions import Now
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .caching import books_changed, bump_generation
+from .indexes import refresh_books, reload_names
+from .models import Author, Book, Genre, Publisher
+from .search import update_search_vector
+
+
+@receiver(post_save, sender=Book)
+def book_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields and "search_vector" in update_fields:
+        return
+    update_search_vector([instance.pk])
+
+
+@receiver(m2m_changed, sender=Book.authors.through)
+@receiver(m2m_changed, sender=Book.genres.through)
+def book_relations_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == "pre_clear":
+        # pk_set is not provided for clear(), remember the affected books
+        instance._cleared_book_ids = list(
+            sender.objects.filter(**{instance._meta.model_name: instance}).values_list(
+                "book_id", flat=True
+            )
+        )
+        return
+
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    if not reverse:
+        update_search_vector([instance.pk])
+    elif action == "post_clear":
+        update_search_vector(getattr(instance, "_cleared_book_ids", []))
+    else:
+        update_search_vector(pk_set)
+
+
+@receiver(post_save, sender=Author)
+def author_saved(sender, instance, created, **kwargs):
+    if not created:
+        update_search_vector(instance.book_set.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=Genre)
+def genre_saved(sender, instance, created, **kwargs):
+    if not created:
+        update_search_vector(instance.book_set.values_list("pk", flat=True))
+
+
+@receiver(pre_delete, sender=Author)
+@receiver(pre_delete, sender=Genre)
+def name_deleting(sender, instance, **kwargs):
+    # the join rows are deleted along with the instance, remember the books
+    instance._deleted_book_ids = list(instance.book_set.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Author)
+@receiver(post_delete, sender=Genre)
+def name_deleted(sender, instance, **kwargs):
+    update_search_vector(getattr(instance, "_deleted_book_ids", []))
+
+
+@receiver(post_save, sender=Author)
+@receiver(post_save, sender=Publisher)
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Author)
+@receiver(post_delete, sender=Publisher)
+@receiver(post_delete, sender=Genre)
+def catalog_changed(sender, **kwargs):
+    bump_generation(sender)
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def catalog_book_changed(sender, instance, **kwargs):
+    books_changed([instance.pk])
+
+
+@receiver(m2m_changed, sender=Book.authors.through)
+@receiver(m2m_changed, sender=Book.genres.through)
+@receiver(m2m_changed, sender=Book.publishers.through)
+def catalog_relations_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    if not reverse:
+        book_ids = [instance.pk]
+    elif pk_set is not None:
+        book_ids = pk_set
+    elif hasattr(instance, "_cleared_book_ids"):
+        book_ids = instance._cleared_book_ids
+    else:
+        # clear() from the publisher side does not say which books it touched
+        bump_generation(Book, type(instance))
+        return
+
+    Book.objects.filter(pk__in=book_ids).update(updated_at=Now())
+    books_changed(book_ids)
+    refresh_books(book_ids)
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def indexed_book_changed(sender, instance, **kwargs):
+    refresh_books([instance.pk])
+
+
+@receiver(post_save, sender=Author)
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Author)
+@receiver(post_delete, sender=Genre)
+def indexed_names_changed(sender, **kwargs):
+    reload_names()
@@ -0,0 +1,97 @@
+from django.db import transaction
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # only the compute_similar_books command needs them
+    np = sparse = None
+
+from .models import Book, SimilarBook
+
+# an author in common says more about a book than a publisher in common
+FEATURE_WEIGHTS = {"authors": 3.0, "genres": 1.0, "publishers": 0.5}
+
+
+def incidence_matrix(weights=FEATURE_WEIGHTS, max_feature_books=5000):
+    """
+    Sparse book x (author, genre, publisher) matrix with L2 normalized rows,
+    so the product of two rows is their cosine similarity. Entries are the
+    relation weight times the idf of the feature. Features found on a single
+    book cannot make neighbours and features shared by more than
+    `max_feature_books` books hardly tell them apart while making the
+    products dense, both are left out.
+
+    Returns the sorted book ids, which are the row labels, and the matrix.
+    """
+    book_ids = np.fromiter(
+        Book.objects.order_by("pk").values_list("pk", flat=True), dtype=np.int64
+    )
+    total = len(book_ids)
+
+    rows, columns, values = [], [], []
+    offset = 0
+    for name, weight in weights.items():
+        field = Book._meta.get_field(name)
+        pairs = np.array(
+            list(
+                field.remote_field.through.objects.values_list(
+                    "book_id", field.m2m_reverse_name()
+                )
+            ),
+            dtype=np.int64,
+        ).reshape(-1, 2)
+
+        features, codes = np.unique(pairs[:, 1], return_inverse=True)
+        document_frequency = np.bincount(codes, minlength=len(features))
+        keep = (document_frequency[codes] > 1) & (
+            document_frequency[codes] <= max_feature_books
+        )
+        idf = np.log1p(total / np.maximum(document_frequency, 1))
+
+        rows.append(np.searchsorted(book_ids, pairs[keep, 0]))
+        columns.append(codes[keep] + offset)
+        values.append(weight * idf[codes[keep]])
+        offset += len(features)
+
+    matrix = sparse.csr_matrix(
+        (np.concatenate(values), (np.concatenate(rows), np.concatenate(columns))),
+        shape=(total, offset),
+    )
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return book_ids, (sparse.diags(1 / norms) @ matrix).tocsr()
+
+
+def top_neighbours(book_ids, matrix, start, stop, k):
+    """
+    Yield (book id, [(similar id, score), ...]) with the `k` best scored
+    neighbours of the rows start:stop, from one sparse product per batch.
+    """
+    scores = (matrix[start:stop] @ matrix.T).tocsr()
+    for offset in range(stop - start):
+        row = start + offset
+        begin, end = scores.indptr[offset], scores.indptr[offset + 1]
+        columns, values = scores.indices[begin:end], scores.data[begin:end]
+
+        other = columns != row
+        columns, values = columns[other], values[other]
+        if len(values) > k:
+            best = np.argpartition(-values, k)[:k]
+            columns, values = columns[best], values[best]
+        order = np.argsort(-values, kind="stable")
+
+        yield int(book_ids[row]), [
+            (int(book_ids[column]), float(score))
+            for column, score in zip(columns[order], values[order])
+        ]
+
+
+def store_neighbours(neighbours):
+    """Replace the stored neighbours of every book in `neighbours`."""
+    with transaction.atomic():
+        SimilarBook.objects.filter(book_id__in=[pk for pk, _ in neighbours]).delete()
+        SimilarBook.objects.bulk_create(
+            SimilarBook(book_id=pk, similar_id=similar, score=score)
+            for pk, similar_books in neighbours
+            for similar, score in similar_books
+        )
@@ -0,0 +1,198 @@
+import math
+import re
+from collections import Counter, defaultdict
+
+from django.conf import settings
+
+from .indexes import BackgroundBuild, InProcessIndex
+from .models import Author, Book, Genre
+
+WORD_RE = re.compile(r"[^\W\d_]{3,}")
+
+
+def words(text):
+    return WORD_RE.findall((text or "").lower())
+
+
+def edit_distance(a, b, limit):
+    """
+    Optimal string alignment distance (adjacent swaps count once), or
+    limit + 1 as soon as it is certain to exceed `limit`.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+
+    previous, current = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        before, previous, current = previous, current, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(
+                previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost
+            )
+            if (
+                before is not None
+                and j > 1
+                and a[i - 1] == b[j - 2]
+                and a[i - 2] == b[j - 1]
+            ):
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+    return current[-1]
+
+
+class SpellingIndex(InProcessIndex):
+    """
+    Symmetric delete spelling corrector over the words of book titles,
+    author names and genre names.
+
+    Every vocabulary word is stored under the strings left after deleting up
+    to `max_distance` characters from its first `prefix_length` characters,
+    so a lookup only generates the deletes of the misspelt word and checks
+    the few words stored under them, no scan of the vocabulary. Word counts
+    are kept per source object, an edited title moves only its own words.
+    """
+
+    max_distance = 2
+    prefix_length = 7
+    # alternatives per misspelt word combined into suggested queries
+    candidates_per_word = 3
+
+    def _reset(self):
+        self.counts = Counter()
+        self.deletes = defaultdict(set)
+        self.documents = {}
+
+    def _load_names(self):
+        for kind, model in (("author", Author), ("genre", Genre)):
+            names = dict(model.objects.values_list("pk", "name"))
+            stale = [
+                key for key in self.documents if key[0] == kind and key[1] not in names
+            ]
+            for key in stale:
+                self._set_document(key, ())
+            for pk, name in names.items():
+                self._set_document((kind, pk), words(name))
+
+    def _refresh(self, book_ids):
+        titles = dict(Book.objects.filter(pk__in=book_ids).values_list("pk", "title"))
+        for pk in book_ids:
+            self._set_document(("book", pk), words(titles.get(pk)))
+
+    def _set_document(self, key, document_words):
+        previous = self.documents.pop(key, ())
+        if previous == document_words:
+            if document_words:
+                self.documents[key] = document_words
+            return
+
+        for word in previous:
+            self.counts[word] -= 1
+            if not self.counts[word]:
+                del self.counts[word]
+                for delete in self._deletes(word):
+                    self.deletes[delete].discard(word)
+                    if not self.deletes[delete]:
+                        del self.deletes[delete]
+        for word in document_words:
+            self.counts[word] += 1
+            if self.counts[word] == 1:
+                for delete in self._deletes(word):
+                    self.deletes[delete].add(word)
+        if document_words:
+            self.documents[key] = document_words
+
+    def _deletes(self, word):
+        found = frontier = {word[: self.prefix_length]}
+        for _ in range(self.max_distance):
+            frontier = {
+                shorter[:i] + shorter[i + 1 :]
+                for shorter in frontier
+                for i in range(len(shorter))
+            }
+            found = found | frontier
+        return found
+
+    def lookup(self, word, limit=None):
+        """Known words close to `word`, closest and most common first."""
+        with self.lock:
+            candidates = set()
+            for delete in self._deletes(word):
+                candidates |= self.deletes.get(delete, set())
+
+            scored = []
+            for candidate in candidates:
+                distance = edit_distance(word, candidate, self.max_distance)
+                if distance <= self.max_distance:
+                    scored.append((distance, -self.counts[candidate], candidate))
+        scored.sort()
+        del scored[limit:]
+        return [(candidate, distance, -count) for distance, count, candidate in scored]
+
+    def suggest(self, text, limit=5):
+        """
+        Corrected versions of the query `text`, best first. Known words are
+        kept, each misspelt one is replaced by its closest alternatives and
+        the combinations are ranked by total distance, then by how common
+        the chosen words are. Empty when every word is known.
+        """
+        with self.lock:
+            options = []
+            misspelt = False
+            for token in text.split():
+                lowered = token.lower()
+                alternatives = None
+                if WORD_RE.fullmatch(lowered) and lowered not in self.counts:
+                    alternatives = self.lookup(lowered, self.candidates_per_word)
+                if alternatives:
+                    misspelt = True
+                    options.append(alternatives)
+                else:
+                    options.append([(token, 0, 0)])
+
+        if not misspelt:
+            return []
+
+        # beam over the words, keeping the `limit` best partial queries
+        beams = [(0, 0.0, ())]
+        for alternatives in options:
+            beams = sorted(
+                (distance + extra, rarity - math.log1p(count), chosen + (word,))
+                for distance, rarity, chosen in beams
+                for word, extra, count in alternatives
+            )[:limit]
+        return [
+            {"text": " ".join(chosen), "distance": distance}
+            for distance, _, chosen in beams
+        ]
+
+
+_index = None
+
+
+def build_spelling_index():
+    """Build the process-wide corrector and start serving it."""
+    global _index
+    index = SpellingIndex()
+    index.rebuild()
+    _index = index
+    return index
+
+
+_build = BackgroundBuild(build_spelling_index)
+
+
+def get_spelling_index():
+    """
+    The process-wide corrector, or None when it is not enabled with the
+    CATALOG_SPELLING_INDEX setting or still being built. The first call
+    starts the build in a background thread, requests never wait for it.
+    """
+    if not getattr(settings, "CATALOG_SPELLING_INDEX", False):
+        return None
+    if _index is None:
+        _build.start()
+        return None
+    _index.sync()
+    return _index
@@ -0,0 +1,132 @@
+import io
+import json
+import tempfile
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from ...catalog_import import iter_json_array
+from ...models import Author, Book, Genre, Publisher
+
+
+class IterJsonArrayTest(TestCase):
+    def test_streams_items_across_chunks(self):
+        document = json.dumps(
+            {
+                "meta": {"editions": 1},
+                "editions": [{"title": f"B{i}"} for i in range(50)],
+            },
+            indent=2,
+        )
+        items = list(iter_json_array(io.StringIO(document), "editions", chunk_size=7))
+        self.assertEqual(
+            [item["title"] for item in items], [f"B{i}" for i in range(50)]
+        )
+
+
+class ImportCatalogCommandTest(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.write(
+            "author.json",
+            {
+                "authors": [
+                    {
+                        "name": "Frank Herbert",
+                        "born_date": "1920-10-08",
+                        "death_date": None,
+                    },
+                    {"name": "Dan Simmons", "born_date": None, "death_date": None},
+                ]
+            },
+        )
+        self.write("publisher.json", {"publishers": [{"name": "Chilton"}]})
+        self.write("genre.json", {"book_categories": [{"name": "Sci-Fi"}]})
+        self.write(
+            "book.json",
+            {
+                "editions": [
+                    {
+                        "isbn_10": "0441172717",
+                        "title": "Dune",
+                        "pages": 412,
+                        "release_date": "1965-08-01",
+                        "description": "Spice.",
+                        "language": {"language": "English"},
+                        "images": [{"url": "https://example.com/dune.jpg"}],
+                        "authors": ["Frank Herbert"],
+                        "genres": [{"name": "Sci-Fi"}],
+                        "publishers": ["Chilton"],
+                    },
+                    {"isbn_10": "12", "title": "Broken ISBN"},
+                    {"isbn_10": "0553283685", "title": "", "pages": 10},
+                    {"isbn_13": "9780441172718", "title": "Bad checksum"},
+                ]
+            },
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, data):
+        (self.dir / name).write_text(json.dumps(data))
+
+    def run_import(self, *args):
+        call_command(
+            "import_catalog", "--dir", str(self.dir), *args, stdout=io.StringIO()
+        )
+
+    def test_import_is_idempotent(self):
+        self.run_import()
+        self.run_import()
+
+        self.assertEqual(Author.objects.count(), 2)
+        self.assertEqual(Publisher.objects.count(), 1)
+        self.assertEqual(Genre.objects.count(), 1)
+        self.assertEqual(Book.objects.count(), 1)
+
+        book = Book.objects.get(isbn="0441172717")
+        self.assertEqual(book.page_count, 412)
+        self.assertEqual(book.cover_image, "https://example.com/dune.jpg")
+        self.assertEqual(
+            list(book.authors.values_list("name", flat=True)), ["Frank Herbert"]
+        )
+        self.assertEqual(book.genres.count(), 1)
+        self.assertEqual(book.publishers.count(), 1)
+        self.assertTrue(Book.objects.filter(search_vector="herbert").exists())
+
+    def test_rejected_rows_are_reported(self):
+        rejects = self.dir / "rejects.ndjson"
+        self.run_import("--rejects", str(rejects))
+
+        rows = [json.loads(line) for line in rejects.read_text().splitlines()]
+        self.assertEqual(
+            [(row["position"], row["reason"]) for row in rows],
+            [(2, "invalid isbn"), (3, "missing title"), (4, "invalid isbn")],
+        )
+
+    def test_import_matches_other_isbn_notation(self):
+        Book.objects.create(title="Dune", isbn="0441172717")
+        self.write(
+            "book.json",
+            {"editions": [{"isbn_13": "9780441172719", "title": "Dune (reissue)"}]},
+        )
+        self.run_import()
+
+        book = Book.objects.get()
+        self.assertEqual((book.isbn, book.title), ("0441172717", "Dune (reissue)"))
+
+    def test_seed_relations_is_stable(self):
+        self.write(
+            "book.json", {"editions": [{"isbn_10": "0553283685", "title": "Hyperion"}]}
+        )
+        self.run_import("--seed-relations")
+        authors = set(Book.objects.get().authors.values_list("pk", flat=True))
+        self.run_import("--seed-relations")
+
+        self.assertTrue(authors)
+        self.assertEqual(
+            set(Book.objects.get().authors.values_list("pk", flat=True)), authors
+        )
@@ -1,5 +1,6 @@
 from django.test import TestCase
 from django.utils import timezone
+from ...isbn import backfill_isbn13
 from ...models import Author, Publisher, Genre, Book
 
 
@@ -30,3 +31,38 @@ class BookModelTest(TestCase):
         self.assertIn(self.author, book.authors.all())
         self.assertIn(self.genre, book.genres.all())
         self.assertIn(self.publisher, book.publishers.all())
+
+    def test_isbn13_is_canonical(self):
+        book = Book.objects.create(title="Dune", isbn="0441172717")
+        self.assertEqual(book.isbn13, "9780441172719")
+
+        book.isbn = "978-0-306-40615-7"
+        book.save(update_fields=["isbn"])
+        book.refresh_from_db()
+        self.assertEqual(book.isbn13, "9780306406157")
+
+    def test_save_keeps_concurrent_counter_updates(self):
+        book = Book.objects.create(title="Dune", isbn="0441172717")
+        Book.objects.filter(pk=book.pk).update(readers_count=3, rating_count=2)
+
+        book.title = "Dune Messiah"
+        book.save()
+        book.refresh_from_db()
+        self.assertEqual(book.title, "Dune Messiah")
+        self.assertEqual((book.readers_count, book.rating_count), (3, 2))
+
+    def test_isbn13_empty_for_invalid_isbn(self):
+        book = Book.objects.create(title="Draft", isbn="1234567890")
+        self.assertIsNone(book.isbn13)
+
+    def test_backfill_isbn13(self):
+        first = Book.objects.create(title="Dune", isbn="0441172717")
+        second = Book.objects.create(title="Dune again", isbn="draft")
+        Book.objects.update(isbn13=None)
+        Book.objects.filter(pk=second.pk).update(isbn="9780441172719")
+
+        self.assertEqual(backfill_isbn13(), 1)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.isbn13, "9780441172719")
+        self.assertIsNone(second.isbn13)
@@ -206,3 +206,11 @@ class BookSerializerTest(TestCase):
         serializer = BookSerializer(data=data)
         self.assertTrue(serializer.is_valid())
         self.assertEqual(serializer.validated_data["isbn"], "9780545010221")
+
+    def test_isbn_of_stored_edition_in_other_notation(self):
+        Book.objects.create(title="Existing", isbn="9780544003415")
+        data = self.valid_data.copy()
+        data["isbn"] = "0544003411"
+        serializer = BookSerializer(data=data)
+        self.assertFalse(serializer.is_valid())
+        self.assertIn("isbn", serializer.errors)
@@ -125,3 +125,13 @@ class AuthorViewSetTest(APITestCase):
         }
         response = self.client.post(url, data)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_multi_get_authors(self):
+        other = Author.objects.create(name="Carl Jung")
+        url = reverse("authors-list")
+        response = self.client.get(url, {"ids": f"{other.id},{self.author.id}"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [author["name"] for author in response.data["results"]],
+            ["Carl Jung", "Sigmund Freud"],
+        )
@@ -1,17 +1,47 @@
+import csv
+import io
+import json
+import tempfile
+from pathlib import Path
+from urllib.parse import urlencode
+from unittest import skipIf
+
 from django.contrib.auth import get_user_model
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.http import QueryDict
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 
+from ... import columnar
+from ... import semantic, similarity, spelling
+from ...caching import get_generations
+from ...counters import update_rating_summary
+from ...facets import facets_cache_key
 from ...models import Book, Author, Genre, Publisher
 
 
 User = get_user_model()
 
 
+# the response cache tests clear the cache, keep them off the shared Redis
+LOCAL_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "book-tests",
+    }
+}
+
+
+@override_settings(CACHES=LOCAL_CACHES)
 class BookViewSetTest(APITestCase):
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
 
         self.admin = User.objects.create_superuser(
@@ -146,6 +176,51 @@ class BookViewSetTest(APITestCase):
         self.assertEqual(len(response.data["results"]), 1)
         self.assertEqual(response.data["results"][0]["id"], self.book2.id)
 
+    def test_search_ranks_title_above_description(self):
+        book = Book.objects.create(
+            title="Quiet Evenings",
+            description="A lighthouse keeper writes letters.",
+            isbn="9780306406157",
+        )
+        self.book1.description = "Nothing about quiet places here."
+        self.book1.save()
+
+        url = reverse("books-list")
+        response = self.client.get(url, {"search": "quiet"})
+        ids = [item["id"] for item in response.data["results"]]
+        self.assertEqual(ids, [book.id, self.book1.id])
+
+    def test_search_returns_each_book_once(self):
+        self.book2.authors.add(self.author1)
+        self.author1.name = "Fiction Writer"
+        self.author1.save()
+
+        url = reverse("books-list")
+        response = self.client.get(url, {"search": "fiction"})
+        ids = [item["id"] for item in response.data["results"]]
+        self.assertEqual(sorted(ids), sorted({self.book1.id, self.book2.id}))
+
+    def test_search_vector_follows_author_rename(self):
+        self.author2.name = "Ursula Le Guin"
+        self.author2.save()
+
+        url = reverse("books-list")
+        self.assertEqual(
+            len(self.client.get(url, {"search": "Smith"}).data["results"]), 0
+        )
+        response = self.client.get(url, {"search": "Guin"})
+        self.assertEqual(response.data["results"][0]["id"], self.book2.id)
+
+    def test_search_vector_follows_author_and_genre_delete(self):
+        url = reverse("books-list")
+        for name, instance in (("Smith", self.author2), ("Science", self.genre2)):
+            response = self.client.get(url, {"search": name})
+            self.assertEqual(response.data["results"][0]["id"], self.book2.id)
+
+            instance.delete()
+            response = self.client.get(url, {"search": name})
+            self.assertEqual(len(response.data["results"]), 0, name)
+
     def test_default_ordering(self):
         url = reverse("books-list")
         response = self.client.get(url)
@@ -171,6 +246,125 @@ class BookViewSetTest(APITestCase):
         response = self.client.get(url, {"page_size": 10})
         self.assertEqual(len(response.data["results"]), 10)
 
+    def test_list_uses_compact_representation(self):
+        self.book1.description = "x" * 500
+        self.book1.save()
+
+        url = reverse("books-list")
+        response = self.client.get(url, {"title": "Test"})
+        item = response.data["results"][0]
+        self.assertEqual(len(item["description"]), 200)
+        self.assertEqual(
+            item["authors"], [{"id": self.author1.id, "name": "John Doe"}]
+        )
+        self.assertEqual(
+            item["publishers"],
+            [{"id": self.publisher1.id, "name": "Test Publisher"}],
+        )
+
+    def test_list_expand_relations(self):
+        url = reverse("books-list")
+        response = self.client.get(url, {"title": "Test", "expand": "authors"})
+        author = response.data["results"][0]["authors"][0]
+        self.assertIn("birth_date", author)
+
+    def test_list_sparse_fieldset(self):
+        url = reverse("books-list")
+        # count, page, genres prefetch
+        with self.assertNumQueries(3):
+            response = self.client.get(url, {"fields": "title,genres"})
+        self.assertEqual(
+            set(response.data["results"][0]), {"id", "title", "genres"}
+        )
+
+    def test_retrieve_sparse_fieldset(self):
+        url = reverse("books-detail", args=[self.book1.pk])
+        response = self.client.get(url, {"fields": "title,isbn"})
+        self.assertEqual(
+            response.data,
+            {"id": self.book1.id, "title": "Test Book", "isbn": "1234567890123"},
+        )
+
+    def _walk_cursor_pages(self, params):
+        url = reverse("books-list")
+        response = self.client.get(url, {"pagination": "cursor", **params})
+        ids = []
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn("count", response.data)
+            ids.extend(item["id"] for item in response.data["results"])
+            if not response.data["next"]:
+                return ids
+            response = self.client.get(response.data["next"])
+
+    def test_cursor_pagination_walks_every_book_once(self):
+        for i in range(7):
+            Book.objects.create(
+                title="Same Title",
+                isbn=f"9990000000{i:03}",
+                page_count=None if i % 3 == 0 else 100 + i % 2,
+            )
+
+        orderings = ["title", "-title", "page_count", "-page_count", "-published_at"]
+        for ordering in orderings:
+            tiebreaker = "-pk" if ordering.startswith("-") else "pk"
+            expected = list(
+                Book.objects.order_by(ordering, tiebreaker).values_list(
+                    "pk", flat=True
+                )
+            )
+            ids = self._walk_cursor_pages({"ordering": ordering, "page_size": 2})
+            self.assertEqual(ids, expected, ordering)
+
+    def test_cursor_pagination_invalid_cursor(self):
+        url = reverse("books-list")
+        response = self.client.get(url, {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_pagination_rejects_unsupported_ordering(self):
+        url = reverse("books-list")
+        for params in (
+            {"ordering": "rating_average"},
+            {"ordering": "title,-page_count"},
+            {"search": "Test"},
+        ):
+            response = self.client.get(url, {"pagination": "cursor", **params})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+            self.assertIn("ordering", response.data)
+
+        response = self.client.get(
+            url, {"pagination": "cursor", "search": "Test", "ordering": "title"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_export_ndjson_admin(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(reverse("books-export"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        rows = {row["isbn"]: row for row in map(json.loads, lines)}
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(
+            rows["1234567890123"]["authors"],
+            [{"id": self.author1.id, "name": "John Doe"}],
+        )
+
+    def test_export_csv_admin(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(reverse("books-export"), {"file_format": "csv"})
+        rows = list(
+            csv.reader(b"".join(response.streaming_content).decode().splitlines())
+        )
+        self.assertEqual(rows[0][-3:], ["authors", "genres", "publishers"])
+        self.assertEqual(len(rows), 3)
+
+    def test_export_regular_user(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(reverse("books-export"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
     # create(), retrieve(), update(), partial_update(), destroy() and list() actions.
 
     def test_create_book_admin(self):
@@ -277,3 +471,486 @@ class BookViewSetTest(APITestCase):
         response = self.client.post(url, data, format="json")
 
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_list_facets(self):
+        cache.clear()
+        self.book2.genres.add(self.genre1)
+        url = reverse("books-list")
+        response = self.client.get(url, {"facets": "genres,language,decade"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        facets = response.data["facets"]
+        self.assertEqual(
+            facets["genres"],
+            [
+                {"value": "Fiction", "count": 2},
+                {"value": "Science Fiction", "count": 1},
+            ],
+        )
+        self.assertEqual(
+            sorted(row["value"] for row in facets["language"]), ["English", "Spanish"]
+        )
+        self.assertEqual(sum(row["count"] for row in facets["decade"]), 2)
+
+    def test_list_facets_follow_filters(self):
+        cache.clear()
+        url = reverse("books-list")
+        response = self.client.get(url, {"facets": "language", "language": "Spanish"})
+        self.assertEqual(
+            response.data["facets"], {"language": [{"value": "Spanish", "count": 1}]}
+        )
+        self.assertNotIn("facets", self.client.get(url).data)
+
+    def test_list_facets_follow_author_rename(self):
+        cache.clear()
+        url = reverse("books-list")
+        params = {"facets": "language", "authors__name__icontains": "Renamed"}
+        self.assertEqual(self.client.get(url, params).data["facets"], {"language": []})
+
+        key = facets_cache_key(QueryDict(urlencode(params)), ["language"])
+        self.author1.name = "Renamed Author"
+        self.author1.save()
+        self.assertNotEqual(
+            facets_cache_key(QueryDict(urlencode(params)), ["language"]), key
+        )
+        self.assertEqual(
+            self.client.get(url, params).data["facets"],
+            {"language": [{"value": "English", "count": 1}]},
+        )
+
+    def test_list_unknown_facet(self):
+        url = reverse("books-list")
+        response = self.client.get(url, {"facets": "colour"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_autocomplete(self):
+        url = reverse("books-autocomplete")
+        response = self.client.get(url, {"q": "ano"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["books"], [{"id": self.book2.id, "label": "Another Book"}]
+        )
+        self.assertEqual(response.data["authors"], [])
+
+        response = self.client.get(url, {"q": "J", "types": "authors"})
+        self.assertEqual(
+            [item["label"] for item in response.data["authors"]],
+            ["Jane Smith", "John Doe"],
+        )
+        self.assertNotIn("books", response.data)
+
+    def test_autocomplete_escapes_wildcards(self):
+        url = reverse("books-autocomplete")
+        response = self.client.get(url, {"q": "%"})
+        self.assertEqual(response.data["books"], [])
+        self.assertEqual(response.data["genres"], [])
+
+    def test_filter_by_isbn_in_either_notation(self):
+        dune = Book.objects.create(title="Dune", isbn="0441172717")
+        url = reverse("books-list")
+        for isbn in ("0441172717", "978-0-441-17271-9"):
+            response = self.client.get(url, {"isbn": isbn})
+            results = response.data["results"]
+            self.assertEqual([book["id"] for book in results], [dune.id])
+
+    def test_lookup_isbns(self):
+        dune = Book.objects.create(title="Dune", isbn="0441172717")
+        url = reverse("books-lookup")
+        self.client.force_authenticate(self.admin)
+        response = self.client.post(
+            url,
+            {"isbns": ["9780441172719", "0-441-17271-7", "9780306406157", "junk"]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(item["isbn"], item["book"]["id"]) for item in response.data["found"]],
+            [("9780441172719", dune.id), ("0-441-17271-7", dune.id)],
+        )
+        self.assertEqual(response.data["missing"], ["9780306406157", "junk"])
+
+    def test_lookup_requires_admin(self):
+        url = reverse("books-lookup")
+        self.client.force_authenticate(self.user)
+        response = self.client.post(url, {"isbns": ["0441172717"]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_lookup_rejects_oversized_batch(self):
+        url = reverse("books-lookup")
+        self.client.force_authenticate(self.admin)
+        response = self.client.post(
+            url, {"isbns": ["0441172717"] * 501}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_multi_get_keeps_requested_order(self):
+        url = reverse("books-list")
+        with self.assertNumQueries(4):
+            response = self.client.get(
+                url, {"ids": f"{self.book2.id},999999,{self.book1.id}"}
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [book["id"] for book in response.data["results"]],
+            [self.book2.id, self.book1.id],
+        )
+        self.assertEqual(response.data["missing"], [999999])
+        authors = response.data["results"][0]["authors"]
+        self.assertEqual(authors[0]["name"], "Jane Smith")
+
+    def test_multi_get_validates_ids(self):
+        url = reverse("books-list")
+        self.assertEqual(
+            self.client.get(url, {"ids": "1,a"}).status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+        ids = ",".join(str(pk) for pk in range(1, 102))
+        self.assertEqual(
+            self.client.get(url, {"ids": ids}).status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+    def bulk_payload(self, count):
+        payload = []
+        for i in range(count):
+            digits = f"978000{i:06d}"
+            check = -sum(int(d) * (3 if n % 2 else 1) for n, d in enumerate(digits))
+            payload.append(
+                {
+                    "title": f"Bulk {i}",
+                    "isbn": f"{digits}{check % 10}",
+                    "authors_ids": [self.author1.id, self.author2.id],
+                    "genres_ids": [self.genre1.id],
+                    "publishers_ids": [self.publisher1.id],
+                }
+            )
+        return payload
+
+    def test_bulk_create(self):
+        self.client.force_authenticate(self.admin)
+        url = reverse("books-list")
+        payload = self.bulk_payload(50)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertLess(len(queries), 25)
+        self.assertEqual(
+            [book["isbn"] for book in response.data],
+            [item["isbn"] for item in payload],
+        )
+        book = Book.objects.get(isbn=payload[7]["isbn"])
+        self.assertEqual(book.authors.count(), 2)
+        self.assertEqual(book.isbn13, payload[7]["isbn"])
+        self.assertEqual(
+            Book.objects.filter(title__startswith="Bulk", search_vector=None).count(),
+            0,
+        )
+
+    def test_bulk_create_is_all_or_nothing(self):
+        self.client.force_authenticate(self.admin)
+        url = reverse("books-list")
+        payload = self.bulk_payload(3)
+        payload[1]["authors_ids"] = [999999]
+        payload[2]["isbn"] = payload[0]["isbn"]
+
+        response = self.client.post(url, payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("authors_ids", response.data[1])
+        self.assertFalse(Book.objects.filter(title__startswith="Bulk").exists())
+
+        payload = self.bulk_payload(2)
+        payload[1]["isbn"] = payload[0]["isbn"]
+        response = self.client.post(url, payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Book.objects.count(), 2)
+
+    def test_bulk_update(self):
+        self.client.force_authenticate(self.admin)
+        url = reverse("books-list")
+        created = self.client.post(url, self.bulk_payload(20), format="json").data
+        payload = [
+            {"id": book["id"], "title": f"Renamed {i}", "genres_ids": [self.genre2.id]}
+            for i, book in enumerate(created)
+        ]
+        payload.reverse()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(url, payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertLess(len(queries), 25)
+        self.assertEqual(
+            [book["title"] for book in response.data],
+            [item["title"] for item in payload],
+        )
+        book = Book.objects.get(pk=created[3]["id"])
+        self.assertEqual(list(book.genres.all()), [self.genre2])
+        self.assertEqual(book.authors.count(), 2)
+        self.assertEqual(book.isbn, created[3]["isbn"])
+
+    def test_bulk_update_rejects_unknown_and_invalid_items(self):
+        self.client.force_authenticate(self.admin)
+        url = reverse("books-list")
+        response = self.client.patch(
+            url, [{"id": 999999, "title": "Ghost"}], format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        first, second = self.client.post(
+            url, self.bulk_payload(2), format="json"
+        ).data
+        response = self.client.patch(
+            url,
+            [
+                {"id": first["id"], "isbn": first["isbn"], "title": "Renamed"},
+                {"id": second["id"], "isbn": first["isbn"]},
+            ],
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("isbn", response.data[1])
+        self.assertFalse(Book.objects.filter(title="Renamed").exists())
+
+        response = self.client.put(url, [{"id": self.book1.id}], format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cached_list_skips_database(self):
+        url = reverse("books-list")
+        self.client.get(url, {"ordering": "title"})
+        # only the counters are read, see refresh_cached_data
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {"ordering": "title"})
+        self.assertEqual(len(response.data["results"]), 2)
+
+    def test_cached_pages_follow_edits(self):
+        list_url = reverse("books-list")
+        detail_url = reverse("books-detail", args=[self.book1.pk])
+        self.client.get(list_url)
+        self.client.get(detail_url)
+
+        self.author1.name = "John Renamed"
+        self.author1.save()
+        response = self.client.get(detail_url)
+        self.assertEqual(response.data["authors"][0]["name"], "John Renamed")
+
+        self.book1.genres.add(self.genre2)
+        response = self.client.get(detail_url)
+        self.assertEqual(len(response.data["genres"]), 2)
+
+        self.book2.delete()
+        self.assertEqual(len(self.client.get(list_url).data["results"]), 1)
+
+    def test_cached_pages_follow_counters(self):
+        detail_url = reverse("books-detail", args=[self.book1.pk])
+        self.client.get(detail_url)
+        update_rating_summary(self.book1.pk, new=4)
+        self.assertEqual(self.client.get(detail_url).data["rating_count"], 1)
+
+    def test_counters_leave_catalog_cache_alone(self):
+        url = reverse("books-list")
+        self.client.get(url)
+        generations = get_generations([Book])
+        updated_at = Book.objects.get(pk=self.book1.pk).updated_at
+
+        update_rating_summary(self.book1.pk, new=4)
+        self.assertEqual(get_generations([Book]), generations)
+        self.assertEqual(Book.objects.get(pk=self.book1.pk).updated_at, updated_at)
+
+        # still the cached page, with the counters merged in
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        card = next(
+            book for book in response.data["results"] if book["id"] == self.book1.pk
+        )
+        self.assertEqual(card["rating_count"], 1)
+
+    def test_book_cards_are_shared_between_lists(self):
+        url = reverse("books-list")
+        self.client.get(url, {"ordering": "title"})
+        # a different page that shows the same books skips the prefetches
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {"ordering": "-title"})
+        self.assertEqual(
+            [book["id"] for book in response.data["results"]],
+            [self.book1.id, self.book2.id],
+        )
+
+    def test_book_cards_follow_edits(self):
+        url = reverse("books-list")
+        self.client.get(url)
+
+        self.publisher1.name = "Renamed Publisher"
+        self.publisher1.save()
+        update_rating_summary(self.book1.pk, new=5)
+        response = self.client.get(url, {"ordering": "-title"})
+
+        card = response.data["results"][0]
+        self.assertEqual(card["publishers"][0]["name"], "Renamed Publisher")
+        self.assertEqual(card["rating_count"], 1)
+
+    def test_conditional_get_book_detail(self):
+        url = reverse("books-detail", args=[self.book1.pk])
+        etag = self.client.get(url)["ETag"]
+
+        # revalidation only reads the version, nothing is serialized
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+        # another book changing leaves this detail alone
+        update_rating_summary(self.book2.pk, new=3)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        update_rating_summary(self.book1.pk, new=5)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_conditional_get_book_list(self):
+        url = reverse("books-list")
+        etag = self.client.get(url)["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # weak validators match too, and catalog pages are the same for everyone
+        self.client.force_authenticate(self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=f"W/{etag}")
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get(
+            url, {"ordering": "-title"}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.author1.name = "Renamed Author"
+        self.author1.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @skipIf(columnar.np is None, "numpy is not installed")
+    @override_settings(CATALOG_COLUMNAR_INDEX=True)
+    def test_columnar_index_filters(self):
+        # built in the background outside of tests
+        columnar.build_catalog_index()
+        self.addCleanup(setattr, columnar, "_index", None)
+        url = reverse("books-list")
+
+        def ids(params):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return sorted(book["id"] for book in response.data["results"])
+
+        self.assertEqual(ids({"min_pages": 200}), [self.book1.id])
+        self.assertEqual(
+            ids({"max_pages": 200, "language": "Spanish"}), [self.book2.id]
+        )
+        self.assertEqual(ids({"genres__name": "Fiction"}), [self.book1.id])
+        self.assertEqual(ids({"authors__name__icontains": "SMITH"}), [self.book2.id])
+        self.assertEqual(ids({"language": "German"}), [])
+        self.assertIsNotNone(columnar._index)
+
+        # the writing process refreshes its index from the signals
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book2.page_count = 500
+            self.book2.save()
+            self.book2.genres.add(self.genre1)
+        self.assertEqual(ids({"min_pages": 200}), [self.book1.id, self.book2.id])
+        self.assertEqual(
+            ids({"genres__name": "Fiction"}), [self.book1.id, self.book2.id]
+        )
+
+        # bulk writes skip the signals and refresh it themselves
+        self.client.force_authenticate(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, self.bulk_payload(2), format="json")
+        created = sorted(book["id"] for book in response.data)
+        self.assertEqual(
+            ids({"genres__name": "Fiction"}), [self.book1.id, self.book2.id, *created]
+        )
+
+    @skipIf(similarity.sparse is None, "numpy and scipy are not installed")
+    def test_similar_books(self):
+        book3 = Book.objects.create(title="Third Book", isbn="9780441013593")
+        book3.authors.add(self.author1)
+        book3.genres.add(self.genre1)
+        call_command("compute_similar_books", stdout=io.StringIO())
+
+        response = self.client.get(reverse("books-similar", args=[self.book1.pk]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item["book"]["id"] for item in response.data], [book3.id])
+        self.assertAlmostEqual(response.data[0]["score"], 1.0, places=3)
+
+        response = self.client.get(reverse("books-similar", args=[self.book2.pk]))
+        self.assertEqual(response.data, [])
+        response = self.client.get(reverse("books-similar", args=[0]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(CATALOG_SPELLING_INDEX=True)
+    def test_search_spelling_suggestions(self):
+        # built in the background outside of tests
+        spelling.build_spelling_index()
+        self.addCleanup(setattr, spelling, "_index", None)
+        url = reverse("books-list")
+
+        response = self.client.get(url, {"search": "Smiht"})
+        self.assertEqual(response.data["suggestions"][0]["text"], "smith")
+
+        response = self.client.get(url, {"search": "Smiht", "autocorrect": "true"})
+        self.assertEqual(response.data["corrected_search"], "smith")
+        self.assertEqual(
+            [book["id"] for book in response.data["results"]], [self.book2.id]
+        )
+
+        # names added later are picked up from the signals
+        with self.captureOnCommitCallbacks(execute=True):
+            Author.objects.create(name="Ursula Le Guin")
+        response = self.client.get(url, {"search": "Ursla"})
+        self.assertEqual(response.data["suggestions"][0]["text"], "ursula")
+
+    @skipIf(semantic.np is None, "numpy and scipy are not installed")
+    def test_semantic_search(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.addCleanup(setattr, semantic, "_index", None)
+        settings = override_settings(SEMANTIC_INDEX_DIR=Path(directory.name) / "lsa")
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        mystery = Book.objects.create(
+            title="Murder in Montmartre",
+            isbn="9780441013593",
+            description="A cozy mystery in Paris where a baker solves crimes",
+        )
+        for isbn, title, description in (
+            ("9780553293357", "Starship Down", "Space battle among distant galaxies"),
+            ("9780765326355", "Galactic Empire", "Starships fight for the galaxies"),
+        ):
+            Book.objects.create(title=title, isbn=isbn, description=description)
+        call_command(
+            "build_semantic_index",
+            "--min-df=1",
+            "--max-df=1",
+            "--dimensions=2",
+            stdout=io.StringIO(),
+        )
+
+        url = reverse("books-list")
+        response = self.client.get(url, {"semantic": "cozy mystery in Paris"})
+        self.assertEqual(response.data["results"][0]["id"], mystery.id)
+
+        # books written after the build are folded in
+        with self.captureOnCommitCallbacks(execute=True):
+            newer = Book.objects.create(
+                title="Paris Secrets",
+                isbn="9780307474278",
+                description="A cozy Paris mystery",
+            )
+        response = self.client.get(url, {"semantic": "cozy mystery in Paris"})
+        self.assertIn(
+            newer.id, [book["id"] for book in response.data["results"][:2]]
+        )
@@ -2,7 +2,28 @@ from rest_framework.routers import DefaultRouter
 
 from .views import BookViewSet, AuthorViewSet, PublisherViewSet, GenreViewSet
 
-router = DefaultRouter()
+
+class BookRouter(DefaultRouter):
+    """
+    Also routes PUT/PATCH on list URLs, for viewsets that implement
+    bulk_update/partial_bulk_update.
+    """
+
+    routes = [
+        route._replace(
+            mapping={
+                **route.mapping,
+                "put": "bulk_update",
+                "patch": "partial_bulk_update",
+            }
+        )
+        if route.name == "{basename}-list"
+        else route
+        for route in DefaultRouter.routes
+    ]
+
+
+router = BookRouter()
 
 router.register(r"books", BookViewSet, basename="books")
 router.register(r"authors", AuthorViewSet, basename="authors")
@@ -1,19 +1,49 @@
 from rest_framework import viewsets
-from rest_framework.permissions import BasePermission, SAFE_METHODS
-from django_filters import rest_framework as filters
-from rest_framework import filters as drf_filters
+from rest_framework.decorators import action
+from rest_framework.permissions import (
+    BasePermission,
+    IsAdminUser,
+    SAFE_METHODS,
+)
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from django.core.cache import cache
+from django.db.models import F
+from django.http import Http404, StreamingHttpResponse
+from django.db.models.functions import Left
 
 from .models import Book, Author, Publisher, Genre
 from .serializers import (
+    BookListSerializer,
     BookSerializer,
     AuthorSerializer,
     PublisherSerializer,
     GenreSerializer,
 )
-from .filters import BookFilter, GenreFilter
+from .caching import (
+    COUNTER_FIELDS,
+    counters_epoch,
+    get_generations,
+    merge_counters,
+    response_cache_key,
+)
+from .export import EXPORT_FORMATS, iter_catalog
+from .isbn import to_isbn13
+from .facets import FACETS_PARAM, cached_facet_counts, parse_facets
+from .pagination import BookCursorPagination
+from .search import AUTOCOMPLETE_SOURCES, autocomplete
+from .spelling import get_spelling_index
+from .filters import (
+    BookFilter,
+    BookOrderingFilter,
+    BookSearchFilter,
+    ColumnarFilterBackend,
+    GenreFilter,
+    SemanticSearchFilter,
+)
+from core.conditional import ConditionalGetMixin
 
 # Create your views here.
 
@@ -26,38 +56,124 @@ class IsAdminOrReadOnly(BasePermission):
         return request.user and request.user.is_staff ### ? to powinno byc tak @Kacper
 
 
-class BookViewSet(viewsets.ModelViewSet):
-    queryset = Book.objects.all().prefetch_related(
-        "authors",
-        "publishers",
-        "genres",
-    )
+class CatalogCacheMixin(ConditionalGetMixin):
+    """
+    Caches list and detail payloads in Redis. Keys carry the generation
+    number of every model in `cache_models`, which book.signals bumps on
+    each write, so an edit is visible on the very next request. The same
+    generations are the ETag version, a revalidation never touches the db.
+    """
+
+    cache_models = ()
+    cache_timeout = 60 * 15
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def get_version(self):
+        if self.action in ("list", "retrieve"):
+            return self.get_cache_generations()
+        return None
+
+    def get_cache_generations(self):
+        # read once per request, for the ETag version and the cache key
+        if not hasattr(self, "_cache_generations"):
+            self._cache_generations = get_generations(self.cache_models)
+        return self._cache_generations
+
+    def refresh_cached_data(self, data):
+        """Hook to bring parts a cached payload kept out of the key up to date."""
+        return data
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        key = response_cache_key(request, self, self.get_cache_generations())
+        data = cache.get(key)
+        if data is not None:
+            return Response(self.refresh_cached_data(data))
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, self.cache_timeout)
+        return response
+
+
+class MultiGetMixin:
+    """
+    `?ids=3,1,2` on the list route returns exactly those objects, in that
+    order, with one query plus the viewset's prefetches.
+    """
+
+    multi_get_param = "ids"
+    max_multi_get = 100
+
+    def list(self, request, *args, **kwargs):
+        if self.multi_get_param in request.query_params:
+            return self.multi_get(request)
+        return super().list(request, *args, **kwargs)
+
+    def get_multi_get_ids(self, request):
+        try:
+            ids = [
+                int(pk)
+                for pk in request.query_params[self.multi_get_param].split(",")
+                if pk.strip()
+            ]
+        except ValueError:
+            raise ValidationError({self.multi_get_param: "Expected integer ids"})
+
+        ids = list(dict.fromkeys(ids))
+        if len(ids) > self.max_multi_get:
+            raise ValidationError(
+                {self.multi_get_param: f"At most {self.max_multi_get} ids per request"}
+            )
+        return ids
+
+    def multi_get(self, request):
+        ids = self.get_multi_get_ids(request)
+        objects = self.get_queryset().in_bulk(ids)
+        serializer = self.get_serializer(
+            [objects[pk] for pk in ids if pk in objects], many=True
+        )
+        return Response(
+            {
+                "results": serializer.data,
+                "missing": [pk for pk in ids if pk not in objects],
+            }
+        )
+
+
+class BookViewSet(CatalogCacheMixin, MultiGetMixin, viewsets.ModelViewSet):
+    queryset = Book.objects.all()
+    cache_models = (Book, Author, Publisher, Genre)
     serializer_class = BookSerializer
     permission_classes = [IsAdminOrReadOnly]
 
     throttle_scope = "books"
 
     filter_backends = [
-        filters.DjangoFilterBackend,
-        drf_filters.SearchFilter,
-        drf_filters.OrderingFilter,
+        ColumnarFilterBackend,
+        BookSearchFilter,
+        SemanticSearchFilter,
+        BookOrderingFilter,
     ]
 
     filterset_class = BookFilter
 
-    search_fields = [
-        "title",
-        "description",
-        "isbn",
-        "authors__name",
-        "genres__name",
-    ]
-
     ordering_fields = [
         "title",
         "published_at",
         "page_count",
         "created_at",
+        "readers_count",
+        "want_to_read_count",
+        "currently_reading_count",
+        "read_count",
+        "rating_count",
+        "rating_average",
+        "rating_bayesian",
     ]
 
     ordering = ["title"]
@@ -67,21 +183,343 @@ class BookViewSet(viewsets.ModelViewSet):
     page_size_query_param = "page_size"
     max_page_size = 100
 
+    related_fields = ("authors", "publishers", "genres")
+
+    max_similar = 20
+    max_lookup_isbns = 500
+    max_bulk_books = 1000
+
+    def get_requested_fields(self):
+        fields = self.request.query_params.get("fields")
+        if not fields:
+            return None
+        return {name.strip() for name in fields.split(",") if name.strip()}
+
+    def get_requested_expand(self):
+        if self.action != "list":
+            return {*self.related_fields, "description"}
+        expand = self.request.query_params.get("expand", "")
+        return {name.strip() for name in expand.split(",") if name.strip()}
+
+    def get_version(self):
+        if self.action == "list":
+            # counters are not in the generations, see book.caching
+            return (*super().get_version(), counters_epoch())
+        if self.action != "retrieve":
+            return super().get_version()
+
+        # a detail only changes with its own row (counters included) and
+        # the related names
+        try:
+            row = (
+                Book.objects.filter(pk=self.kwargs[self.lookup_field])
+                .values_list("updated_at", *COUNTER_FIELDS)
+                .first()
+            )
+        except ValueError:
+            return None
+        if row is None:
+            return None
+        return row, get_generations([Author, Publisher, Genre])
+
+    def refresh_cached_data(self, data):
+        merge_counters(data["results"] if "results" in data else [data])
+        return data
+
+    def get_queryset(self):
+        queryset = super().get_queryset().defer("search_vector")
+        if self.action not in ("list", "retrieve"):
+            return queryset.prefetch_related(*self.related_fields)
+
+        fields = self.get_requested_fields()
+        expand = self.get_requested_expand()
+
+        # only fetch what the (sparse) representation is going to render,
+        # default list cards load relations for fragment cache misses only
+        for name in self.related_fields:
+            if fields is not None and name not in fields:
+                continue
+            if name in expand:
+                queryset = queryset.prefetch_related(name)
+            elif fields is not None or expand or self.action != "list":
+                queryset = queryset.prefetch_related(
+                    BookListSerializer.summary_prefetch(name)
+                )
+
+        if fields is not None:
+            columns = {f.name for f in Book._meta.concrete_fields} & fields
+            if "rating_histogram" in fields:
+                columns.update(f"rating_{star}" for star in range(1, 6))
+            queryset = queryset.only("pk", *columns)
+
+        if "description" not in expand and (
+            fields is None or "description" in fields
+        ):
+            queryset = queryset.defer("description").annotate(
+                description_preview=Left(
+                    "description", BookListSerializer.DESCRIPTION_LENGTH
+                )
+            )
+
+        return queryset
+
+    def create(self, request, *args, **kwargs):
+        # a list payload creates the whole batch in a handful of queries
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+
+        if len(request.data) > self.max_bulk_books:
+            return Response(
+                {"error": f"At most {self.max_bulk_books} books per request"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        books = serializer.save()
+
+        queryset = self.get_queryset().filter(pk__in=[book.pk for book in books])
+        data = BookListSerializer(
+            queryset.order_by("pk"), many=True, context=self.get_serializer_context()
+        ).data
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    def bulk_update(self, request, *args, **kwargs):
+        """PUT/PATCH /books/ [{"id": ..., ...}] - Update a batch of books"""
+        items = request.data
+        if not isinstance(items, list) or len(items) > self.max_bulk_books:
+            return Response(
+                {"error": f"Expected a list of at most {self.max_bulk_books} books"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        ids = [item.get("id") if isinstance(item, dict) else None for item in items]
+        if len(set(ids)) != len(ids) or not all(
+            isinstance(pk, int) and not isinstance(pk, bool) for pk in ids
+        ):
+            return Response(
+                {"error": "Every book needs a distinct integer id"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        books = Book.objects.defer("search_vector").in_bulk(ids)
+        missing = [pk for pk in ids if pk not in books]
+        if missing:
+            return Response(
+                {"error": f"Books not found: {missing}"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        serializer = self.get_serializer(
+            [books[pk] for pk in ids],
+            data=items,
+            many=True,
+            partial=kwargs.get("partial", False),
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        queryset = self.get_queryset().filter(pk__in=ids)
+        updated = {book.pk: book for book in queryset}
+        data = BookListSerializer(
+            [updated[pk] for pk in ids],
+            many=True,
+            context=self.get_serializer_context(),
+        ).data
+        return Response(data)
+
+    def partial_bulk_update(self, request, *args, **kwargs):
+        kwargs["partial"] = True
+        return self.bulk_update(request, *args, **kwargs)
+
+    def get_serializer_class(self):
+        if self.action == "list":
+            return BookListSerializer
+        return super().get_serializer_class()
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action in ("list", "retrieve"):
+            kwargs.setdefault("fields", self.get_requested_fields())
+        if self.action == "list":
+            kwargs.setdefault("expand", self.get_requested_expand())
+        return super().get_serializer(*args, **kwargs)
+
+    def paginate_queryset(self, queryset):
+        # ?facets=genres,language,decade adds counts for the whole match
+        self.facets = parse_facets(self.request.query_params.get(FACETS_PARAM))
+        self.facets_queryset = queryset
+        return super().paginate_queryset(queryset)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.facets:
+            response.data["facets"] = cached_facet_counts(
+                self.request, self.facets_queryset, self.facets
+            )
+        self.add_spelling(response, data)
+        return response
+
+    def add_spelling(self, response, data):
+        # "did you mean" for searches that (nearly) came up empty
+        if getattr(self, "corrected_search", None):
+            response.data["corrected_search"] = self.corrected_search
+            return
+
+        search = self.request.query_params.get(BookSearchFilter.search_param)
+        hits = response.data.get("count", len(data))
+        if search and hits < BookSearchFilter.few_hits:
+            index = get_spelling_index()
+            if index is not None:
+                response.data["suggestions"] = index.suggest(search)
+
+    @property
+    def paginator(self):
+        # ?pagination=cursor switches to count-free keyset pagination
+        if not hasattr(self, "_paginator"):
+            params = self.request.query_params
+            if (
+                params.get("pagination") == "cursor"
+                or BookCursorPagination.cursor_query_param in params
+            ):
+                self._paginator = BookCursorPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    @action(detail=False, methods=["get"])
+    def autocomplete(self, request):
+        """GET /books/autocomplete/?q=prefix - Typeahead titles, authors, genres"""
+        try:
+            limit = min(int(request.query_params.get("limit", 10)), 25)
+        except ValueError:
+            limit = 10
+
+        sources = request.query_params.get("types")
+        sources = (
+            [name for name in sources.split(",") if name in AUTOCOMPLETE_SOURCES]
+            if sources
+            else list(AUTOCOMPLETE_SOURCES)
+        )
+        return Response(
+            autocomplete(request.query_params.get("q", ""), max(limit, 1), sources)
+        )
+
+    @action(detail=True, methods=["get"])
+    def similar(self, request, pk=None):
+        """GET /books/{id}/similar/?limit=10 - Precomputed "more like this" books"""
+        try:
+            limit = min(int(request.query_params.get("limit", 10)), self.max_similar)
+        except ValueError:
+            limit = 10
+
+        # one join on the (book, -score) index, cards come from the fragment
+        # cache and relations are only loaded for misses
+        try:
+            books = list(
+                Book.objects.filter(similar_to__book_id=pk)
+                .defer("search_vector", "description")
+                .annotate(
+                    similarity=F("similar_to__score"),
+                    description_preview=Left(
+                        "description", BookListSerializer.DESCRIPTION_LENGTH
+                    ),
+                )
+                .order_by("-similarity")[: max(limit, 1)]
+            )
+        except ValueError:
+            raise Http404
+        if not books and not Book.objects.filter(pk=pk).exists():
+            raise Http404
+
+        cards = BookListSerializer(
+            books, many=True, context=self.get_serializer_context()
+        ).data
+        return Response(
+            [
+                {"score": round(book.similarity, 4), "book": card}
+                for book, card in zip(books, cards)
+            ]
+        )
+
+    @action(detail=False, methods=["post"])
+    def lookup(self, request):
+        """POST /books/lookup/ {"isbns": [...]} - Resolve ISBN-10/13 in bulk"""
+        isbns = request.data.get("isbns")
+        if not isinstance(isbns, list) or len(isbns) > self.max_lookup_isbns:
+            return Response(
+                {
+                    "error": "isbns must be a list of at most "
+                    f"{self.max_lookup_isbns} ISBNs"
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        canonical = {isbn: to_isbn13(isbn) for isbn in map(str, isbns)}
+        books = {
+            book.isbn13: book
+            for book in self.get_queryset().filter(
+                isbn13__in={isbn for isbn in canonical.values() if isbn}
+            )
+        }
+
+        found, missing = [], []
+        for isbn, isbn13 in canonical.items():
+            if isbn13 in books:
+                found.append((isbn, books[isbn13]))
+            else:
+                missing.append(isbn)
+
+        serializer = BookListSerializer(
+            [book for _, book in found],
+            many=True,
+            context=self.get_serializer_context(),
+        )
+        return Response(
+            {
+                "found": [
+                    {"isbn": isbn, "book": data}
+                    for (isbn, _), data in zip(found, serializer.data)
+                ],
+                "missing": missing,
+            }
+        )
+
+    @action(detail=False, methods=["get"], permission_classes=[IsAdminUser])
+    def export(self, request):
+        """GET /books/export/?file_format=ndjson|csv - Stream the whole catalog"""
+        file_format = request.query_params.get("file_format", "ndjson")
+        if file_format not in EXPORT_FORMATS:
+            return Response(
+                {"error": f"Unsupported format, use one of {sorted(EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        render, content_type = EXPORT_FORMATS[file_format]
+        response = StreamingHttpResponse(
+            render(iter_catalog()), content_type=content_type
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="catalog.{file_format}"'
+        )
+        return response
+
 
-class AuthorViewSet(viewsets.ModelViewSet):
+class AuthorViewSet(CatalogCacheMixin, MultiGetMixin, viewsets.ModelViewSet):
     queryset = Author.objects.all()
+    cache_models = (Author,)
     serializer_class = AuthorSerializer
     permission_classes = [IsAdminOrReadOnly]
 
 
-class PublisherViewSet(viewsets.ModelViewSet):
+class PublisherViewSet(CatalogCacheMixin, MultiGetMixin, viewsets.ModelViewSet):
     queryset = Publisher.objects.all()
+    cache_models = (Publisher,)
     serializer_class = PublisherSerializer
     permission_classes = [IsAdminOrReadOnly]
 
 
-class GenreViewSet(viewsets.ModelViewSet):
+class GenreViewSet(CatalogCacheMixin, MultiGetMixin, viewsets.ModelViewSet):
     queryset = Genre.objects.all()
+    cache_models = (Genre,)
     serializer_class = GenreSerializer
     permission_classes = [IsAdminOrReadOnly]
     filterset_class = GenreFilter
@@ -0,0 +1,100 @@
+import hashlib
+
+from rest_framework import status
+from rest_framework.response import Response
+from django.utils.http import (
+    http_date,
+    parse_etags,
+    parse_http_date_safe,
+    quote_etag,
+)
+
+
+class NotModified(Exception):
+    pass
+
+
+class ConditionalGetMixin:
+    """
+    Strong ETag (and optionally Last-Modified) validators for GET requests.
+
+    Views return a cheap version of what the request is going to render
+    from `get_version()`, typically a few timestamps or cache generations.
+    A matching If-None-Match (or, without one, If-Modified-Since) answers
+    304 right after the permission checks, before any queryset is
+    evaluated or serialized. Returning None opts a request out.
+
+    The version is computed once per GET and kept as `resource_version`
+    for the view to reuse while building the response. Views rendering
+    per-user data set `etag_per_user`, shared data gets one ETag for all.
+    """
+
+    etag_per_user = False
+
+    def get_version(self):
+        return None
+
+    def get_last_modified(self):
+        """Only for views whose version is fully described by a timestamp."""
+        return None
+
+    def get_etag(self, request):
+        if self.resource_version is None:
+            return None
+
+        digest = hashlib.md5(
+            repr(
+                (
+                    self.resource_version,
+                    request.path,
+                    sorted(request.query_params.lists()),
+                    request.accepted_renderer.format,
+                    request.user.pk if self.etag_per_user else None,
+                )
+            ).encode()
+        ).hexdigest()
+        return quote_etag(digest)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.etag = self.last_modified = self.resource_version = None
+        if request.method not in ("GET", "HEAD"):
+            return
+
+        self.resource_version = self.get_version()
+        self.etag = self.get_etag(request)
+        last_modified = self.get_last_modified()
+        if last_modified is not None:
+            self.last_modified = int(last_modified.timestamp())
+
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match is not None:
+            # If-None-Match uses the weak comparison, W/ does not matter
+            etags = {etag.removeprefix("W/") for etag in parse_etags(if_none_match)}
+            if self.etag is not None and (self.etag in etags or if_none_match == "*"):
+                raise NotModified
+            return
+
+        if_modified_since = parse_http_date_safe(
+            request.headers.get("If-Modified-Since", "")
+        )
+        if (
+            self.last_modified is not None
+            and if_modified_since is not None
+            and self.last_modified <= if_modified_since
+        ):
+            raise NotModified
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            if getattr(self, "etag", None):
+                response["ETag"] = self.etag
+            if getattr(self, "last_modified", None) is not None:
+                response["Last-Modified"] = http_date(self.last_modified)
+        return response
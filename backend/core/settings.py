@@ -24,6 +24,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "rest_framework_simplejwt.token_blacklist",
     "corsheaders",
@@ -100,6 +101,17 @@ CACHES = {
     }
 }
 
+# answer the book browse filters from an in-process numpy index,
+# see book.columnar
+CATALOG_COLUMNAR_INDEX = os.environ.get("CATALOG_COLUMNAR_INDEX", "False") == "True"
+
+# "did you mean" suggestions for searches from an in-process index built
+# in the background, see book.spelling
+CATALOG_SPELLING_INDEX = os.environ.get("CATALOG_SPELLING_INDEX", "False") == "True"
+
+# written by the build_semantic_index command, see book.semantic
+SEMANTIC_INDEX_DIR = os.environ.get("SEMANTIC_INDEX_DIR", BASE_DIR / "semantic_index")
+
 CHANNEL_LAYERS = {
     "default": {
         "BACKEND": "channels_redis.core.RedisChannelLayer",
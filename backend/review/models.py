@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.auth import get_user_model
 from book.models import Book
@@ -36,6 +36,15 @@ class Review(models.Model):
     def __str__(self):
         return f"{self.user.username}'s review of {self.book.title}"
 
+    def save(self, *args, **kwargs):
+        # the book's rating summary is updated by signals in the same transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
+
 
 class ReviewLike(models.Model):
     user = models.ForeignKey(
@@ -0,0 +1,83 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from book.models import Book, Genre
+from ...models import Review
+
+User = get_user_model()
+
+
+class RatingSummaryTests(TestCase):
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(
+                username=f"user{i}",
+                first_name="Test",
+                last_name="User",
+                email=f"user{i}@example.com",
+                password="testpass123",
+            )
+            for i in range(3)
+        ]
+        self.book = Book.objects.create(title="Dune", isbn="9780441172719")
+
+    def summary(self):
+        self.book.refresh_from_db()
+        return (
+            self.book.rating_count,
+            self.book.rating_sum,
+            self.book.rating_histogram,
+        )
+
+    def test_create_update_delete(self):
+        first = Review.objects.create(user=self.users[0], book=self.book, rating=5)
+        Review.objects.create(user=self.users[1], book=self.book, rating=3)
+        self.assertEqual(self.summary(), (2, 8, {1: 0, 2: 0, 3: 1, 4: 0, 5: 1}))
+        self.assertEqual(self.book.rating_average, 4.0)
+
+        first.rating = 1
+        first.save()
+        self.assertEqual(self.summary(), (2, 4, {1: 1, 2: 0, 3: 1, 4: 0, 5: 0}))
+
+        first.delete()
+        self.assertEqual(self.summary(), (1, 3, {1: 0, 2: 0, 3: 1, 4: 0, 5: 0}))
+
+        prior = Book.RATING_PRIOR_MEAN * Book.RATING_PRIOR_WEIGHT
+        self.assertAlmostEqual(
+            self.book.rating_bayesian, (prior + 3) / (Book.RATING_PRIOR_WEIGHT + 1)
+        )
+
+    def test_unrated_book(self):
+        self.assertEqual(self.summary(), (0, 0, {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}))
+        self.assertIsNone(self.book.rating_average)
+        self.assertEqual(self.book.rating_bayesian, Book.RATING_PRIOR_MEAN)
+
+    def test_reconcile_repairs_ratings(self):
+        Review.objects.create(user=self.users[0], book=self.book, rating=4)
+        Book.objects.filter(pk=self.book.pk).update(rating_count=9, rating_4=0)
+
+        call_command("reconcile_book_counters", stdout=StringIO())
+        self.assertEqual(self.summary(), (1, 4, {1: 0, 2: 0, 3: 0, 4: 1, 5: 0}))
+        self.assertEqual(self.book.rating_average, 4.0)
+
+    def test_top_rated_in_genre(self):
+        genre = Genre.objects.create(name="Sci-Fi")
+        other = Book.objects.create(title="Hyperion", isbn="9780553283686")
+        self.book.genres.add(genre)
+        other.genres.add(genre)
+        for user in self.users:
+            Review.objects.create(user=user, book=other, rating=5)
+        Review.objects.create(user=self.users[0], book=self.book, rating=5)
+
+        response = APIClient().get(
+            reverse("books-list"),
+            {"genres__name": "Sci-Fi", "ordering": "-rating_bayesian"},
+        )
+        results = response.data["results"]
+        self.assertEqual([item["id"] for item in results], [other.id, self.book.id])
+        self.assertEqual(results[0]["rating_count"], 3)
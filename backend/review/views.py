@@ -4,6 +4,7 @@ from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticate
 from rest_framework.decorators import action
 from rest_framework import status
 
+from django.db.models import Count, Max
 from django.shortcuts import get_object_or_404
 
 from .permissions import IsCommentOwner, IsReviewOwner
@@ -12,12 +13,35 @@ from .pagination import CommentPagination
 from .serializers import ReviewSerializer, ReviewLikeSerializer, ReviewCommentSerializer
 
 from book.models import Book
+from core.conditional import ConditionalGetMixin
 from .models import Review, ReviewLike, ReviewComment
 
 
-class ReviewViewSet(ModelViewSet):
+class ReviewViewSet(ConditionalGetMixin, ModelViewSet):
     serializer_class = ReviewSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    # likes and ownership are rendered for the requesting user
+    etag_per_user = True
+
+    def get_version(self):
+        if self.action not in ("list", "retrieve"):
+            return None
+
+        reviews = Review.objects.filter(book_id=self.kwargs["book_pk"])
+        if self.action == "retrieve":
+            try:
+                reviews = reviews.filter(pk=self.kwargs["pk"])
+            except ValueError:
+                return None
+        # likes are rendered too and do not touch the review row
+        return tuple(
+            reviews.aggregate(
+                Max("updated_at"),
+                Count("id", distinct=True),
+                Max("likes__created_at"),
+                Count("likes", distinct=True),
+            ).values()
+        )
 
     def get_queryset(self):
         return (
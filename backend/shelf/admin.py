@@ -1,6 +1,8 @@
 from django.contrib import admin
-from .models import Shelf
+from .models import ReadingStatus, Shelf, ShelfEntry
 
 # Register your models here.
 
 admin.site.register(Shelf)
+admin.site.register(ShelfEntry)
+admin.site.register(ReadingStatus)
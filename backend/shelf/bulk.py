@@ -0,0 +1,96 @@
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery
+from django.db.models.signals import m2m_changed
+from django.utils import timezone
+
+from book.models import Book
+from statistics.utils import deferred_recalculation
+from .models import ShelfEntry
+
+# reading progress a moved book takes along to its new shelf
+PROGRESS_FIELDS = ("pages_read", "started_at", "finished_at")
+
+
+def _on_shelf(shelf, book_ids):
+    return set(
+        ShelfEntry.objects.filter(shelf=shelf, book_id__in=book_ids).values_list(
+            "book_id", flat=True
+        )
+    )
+
+
+def _insert_entries(shelf, book_ids):
+    """
+    Insert the entries of `book_ids` missing on `shelf` in one statement,
+    rows a concurrent add got in first are skipped instead of failing.
+    Returns the ids of the books actually inserted, which bulk_create with
+    ignore_conflicts cannot tell.
+    """
+    if not book_ids:
+        return set()
+    table = connection.ops.quote_name(ShelfEntry._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (shelf_id, book_id, added_at)"
+            " SELECT %s, book_id, %s FROM unnest(%s::bigint[]) AS book_id"
+            " ON CONFLICT (shelf_id, book_id) DO NOTHING RETURNING book_id",
+            [shelf.pk, timezone.now(), sorted(book_ids)],
+        )
+        return {book_id for (book_id,) in cursor.fetchall()}
+
+
+def _send_add(shelf, action, book_ids):
+    # what shelf.books.add() sends, so the shelf signals keep the counters,
+    # versions, reading statuses and statistics in step
+    m2m_changed.send(
+        sender=ShelfEntry,
+        instance=shelf,
+        action=action,
+        reverse=False,
+        model=Book,
+        pk_set=book_ids,
+        using=shelf._state.db,
+    )
+
+
+def copy_progress(source, target, book_ids):
+    """Copy the progress of `book_ids` from their `source` to `target` entries."""
+    if not book_ids:
+        return
+    entries = ShelfEntry.objects.filter(shelf=source, book_id=OuterRef("book_id"))
+    ShelfEntry.objects.filter(shelf=target, book_id__in=book_ids).update(
+        **{name: Subquery(entries.values(name)[:1]) for name in PROGRESS_FIELDS}
+    )
+
+
+def reshelve(book_ids, add_to=None, remove_from=None):
+    """
+    Put `book_ids` on `add_to` and take them off `remove_from`, both for a
+    move, in one transaction. Each side is one set-based insert of the
+    missing entries or one delete, so the shelf signals (counters, shelf
+    versions) fire once per side, for the rows that really changed, and the
+    user statistics are recalculated once. Returns the number of entries
+    added and removed.
+    """
+    added, removed = set(), set()
+    with transaction.atomic(), deferred_recalculation():
+        if remove_from is not None:
+            removed = _on_shelf(remove_from, book_ids)
+
+        # adding first keeps moved books counted as readers throughout
+        if add_to is not None:
+            # pre_add takes the default shelf locks before the insert
+            _send_add(add_to, "pre_add", set(book_ids))
+            added = _insert_entries(add_to, book_ids)
+            if added:
+                _send_add(add_to, "post_add", added)
+
+        if remove_from is not None:
+            remaining = removed
+            if add_to is not None:
+                # a move between default shelves is done by post_add already
+                remaining = _on_shelf(remove_from, book_ids)
+                copy_progress(remove_from, add_to, added & remaining)
+            remove_from.books.remove(*remaining)
+
+    return len(added), len(removed)
@@ -0,0 +1,72 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from shelf.models import ShelfEntry
+
+LEGACY_TABLE = "shelf_shelf_books"
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the rows of the former implicit shelf/book table into "
+        "ShelfEntry, in short keyset batches. See "
+        "docs/shelf-entries-migration.md for the migration it belongs to"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--table", default=LEGACY_TABLE)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0,
+            help="Seconds to sleep between batches",
+        )
+
+    def handle(self, *args, **options):
+        table = options["table"]
+        if table not in connection.introspection.table_names():
+            raise CommandError(f"No table {table}, nothing to copy")
+
+        select = (
+            f"SELECT id, shelf_id, book_id FROM {connection.ops.quote_name(table)}"
+            " WHERE id > %s ORDER BY id LIMIT %s"
+        )
+        # the old rows carry no timestamp, they count as added now and keep
+        # their relative order through a microsecond per legacy id, so the
+        # "date added" sort does not fall back to the book id
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT MAX(id) FROM {connection.ops.quote_name(table)}")
+            (max_id,) = cursor.fetchone()
+        now = timezone.now()
+        last_id = copied = 0
+        while True:
+            # one short transaction per batch, writers never wait for long
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute(select, [last_id, options["batch_size"]])
+                    rows = cursor.fetchall()
+                if not rows:
+                    break
+                ShelfEntry.objects.bulk_create(
+                    [
+                        ShelfEntry(
+                            shelf_id=shelf_id,
+                            book_id=book_id,
+                            added_at=now - timedelta(microseconds=max_id - id_),
+                        )
+                        for id_, shelf_id, book_id in rows
+                    ],
+                    ignore_conflicts=True,
+                )
+            copied += len(rows)
+            last_id = rows[-1][0]
+            self.stdout.write(f"Copied {copied} rows")
+            if options["pause"]:
+                time.sleep(options["pause"])
+
+        self.stdout.write(self.style.SUCCESS(f"Done, {copied} rows copied"))
@@ -0,0 +1,70 @@
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from shelf.models import ReadingStatus, Shelf, ShelfEntry
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the reading statuses from default shelf membership, keeping "
+        "each book on its latest default shelf only"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        last_pk = users = statuses = removed = 0
+        while True:
+            user_ids = list(
+                User.objects.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .values_list("pk", flat=True)[: options["batch_size"]]
+            )
+            if not user_ids:
+                break
+
+            # a book on several default shelves keeps the latest one and is
+            # taken off the others, through the manager so counters follow
+            entries = (
+                ShelfEntry.objects.filter(
+                    shelf__user_id__in=user_ids, shelf__is_default=True
+                )
+                .order_by("added_at", "pk")
+                .values_list(
+                    "shelf__user_id", "book_id", "shelf_id", "shelf__shelf_type"
+                )
+            )
+            latest, shelves = {}, {}
+            for user, book, shelf_id, status in entries:
+                latest[user, book] = status
+                shelves.setdefault((user, book), []).append(shelf_id)
+            losers = defaultdict(list)
+            for (user, book), shelf_ids in shelves.items():
+                for shelf_id in shelf_ids[:-1]:
+                    losers[shelf_id].append(book)
+
+            with transaction.atomic():
+                for shelf in Shelf.objects.filter(pk__in=losers):
+                    shelf.books.remove(*losers[shelf.pk])
+                ReadingStatus.objects.filter(user_id__in=user_ids).delete()
+                ReadingStatus.objects.bulk_create(
+                    ReadingStatus(user_id=user, book_id=book, status=status)
+                    for (user, book), status in latest.items()
+                )
+
+            removed += sum(map(len, losers.values()))
+            users += len(user_ids)
+            statuses += len(latest)
+            last_pk = user_ids[-1]
+            self.stdout.write(
+                f"Synced {users} users, {statuses} statuses, "
+                f"removed {removed} duplicate entries"
+            )
+
+        self.stdout.write(self.style.SUCCESS("Done"))
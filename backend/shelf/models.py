@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from book.models import Book
 from django.contrib.auth import get_user_model
 from django.core.validators import MinLengthValidator
@@ -24,7 +25,10 @@ class Shelf(models.Model):
         max_length=20, choices=SHELF_TYPES, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    books = models.ManyToManyField(Book, related_name="shelves")
+    # databases created before ShelfEntry need the migration steps in
+    # docs/shelf-entries-migration.md
+    books = models.ManyToManyField(
+        Book, through="ShelfEntry", related_name="shelves")
 
     class Meta:
         constraints = [
@@ -59,3 +63,69 @@ class Shelf(models.Model):
         if self.is_default:
             raise ValidationError('Default shelves cannot be deleted')
         super().delete(*args, **kwargs)
+
+
+class ShelfEntry(models.Model):
+    """A book on a shelf: when it was put there and how far the reading got."""
+    shelf = models.ForeignKey(
+        Shelf, on_delete=models.CASCADE, related_name="entries")
+    book = models.ForeignKey(
+        Book, on_delete=models.CASCADE, related_name="shelf_entries")
+    added_at = models.DateTimeField(default=timezone.now)
+    pages_read = models.PositiveIntegerField(null=True, blank=True)
+    started_at = models.DateField(null=True, blank=True)
+    finished_at = models.DateField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = "shelf entries"
+        constraints = [
+            UniqueConstraint(
+                fields=['shelf', 'book'],
+                name='unique_shelf_entry'
+            )
+        ]
+        indexes = [
+            # a shelf's books by date added, see ShelfViewSet.books
+            models.Index(
+                fields=['shelf', 'added_at'], name='shelf_entry_added_idx'),
+            # the shelves holding given books, counters and membership
+            models.Index(
+                fields=['book', 'shelf'], name='shelf_entry_book_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.book_id} on {self.shelf_id}"
+
+    def clean(self):
+        if (
+            self.started_at and self.finished_at
+            and self.finished_at < self.started_at
+        ):
+            raise ValidationError('Cannot finish a book before starting it')
+
+
+class ReadingStatus(models.Model):
+    """
+    Which default shelf holds a book for a user, one row per (user, book).
+    Denormalized from default shelf membership by shelf.signals, which move
+    a book off its previous default shelf under a per-user lock, see
+    shelf.statuses.lock_default_shelves.
+    """
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="reading_statuses")
+    book = models.ForeignKey(
+        Book, on_delete=models.CASCADE, related_name="reading_statuses")
+    status = models.CharField(max_length=20, choices=Shelf.SHELF_TYPES)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "reading statuses"
+        constraints = [
+            UniqueConstraint(
+                fields=['user', 'book'],
+                name='unique_reading_status'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.book_id} {self.status}"
@@ -81,6 +81,16 @@ class ShelfSerializer(serializers.ModelSerializer):
         return super().update(instance, validated_data)
 
 
+class ShelfListSerializer(ShelfSerializer):
+    """Shelf rows of the list page with the book count and cover previews."""
+
+    book_count = serializers.IntegerField(read_only=True)
+    cover_previews = serializers.ListField(read_only=True)
+
+    class Meta(ShelfSerializer.Meta):
+        fields = ShelfSerializer.Meta.fields + ['book_count', 'cover_previews']
+
+
 class AddBookToShelfSerializer(serializers.Serializer):
     book_id = serializers.PrimaryKeyRelatedField(queryset=Book.objects.all())
 
@@ -94,3 +104,48 @@ class AddBookToShelfSerializer(serializers.Serializer):
 
 class RemoveBookFromShelfSerializer(serializers.Serializer):
     book_id = serializers.PrimaryKeyRelatedField(queryset=Book.objects.all())
+
+
+class BulkShelfBooksSerializer(serializers.Serializer):
+    """Books to put on `add_to`, take off `remove_from`, or both to move."""
+
+    MAX_BOOKS = 1000
+
+    book_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_BOOKS,
+    )
+    add_to = serializers.PrimaryKeyRelatedField(
+        queryset=Shelf.objects.none(), required=False)
+    remove_from = serializers.PrimaryKeyRelatedField(
+        queryset=Shelf.objects.none(), required=False)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        shelves = Shelf.objects.filter(user=self.context['request'].user)
+        self.fields['add_to'].queryset = shelves
+        self.fields['remove_from'].queryset = shelves
+
+    def validate_book_ids(self, value):
+        return list(dict.fromkeys(value))
+
+    def validate(self, attrs):
+        add_to = attrs.get('add_to')
+        remove_from = attrs.get('remove_from')
+        if add_to is None and remove_from is None:
+            raise serializers.ValidationError(
+                "Give a shelf to add to, to remove from, or both")
+        if add_to is not None and add_to == remove_from:
+            raise serializers.ValidationError(
+                "Cannot move books to the shelf they are on")
+
+        if add_to is not None:
+            book_ids = attrs['book_ids']
+            found = set(
+                Book.objects.filter(pk__in=book_ids).values_list('pk', flat=True))
+            missing = [pk for pk in book_ids if pk not in found]
+            if missing:
+                raise serializers.ValidationError(
+                    {'book_ids': [f"Unknown books: {missing}"]})
+        return attrs
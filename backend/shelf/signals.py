@@ -1,7 +1,13 @@
-from django.db.models.signals import post_save
+from django.db.models import Q
+from django.db.models.functions import Now
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
-from .models import Shelf
+from book.counters import update_engagement_counters
+from book.models import Book
+from .membership import memberships_changed
+from .models import Shelf, ShelfEntry
+from .statuses import clear_default_shelf, lock_default_shelves, set_default_shelf
 
 User = get_user_model()
 
@@ -28,3 +34,135 @@ def create_default_shelves(sender, instance, created, **kwargs):
             shelf_type='read',
             is_default=True
         )
+
+
+def _shelf_book_ids(shelf, book_ids=None):
+    rows = Shelf.books.through.objects.filter(shelf=shelf)
+    if book_ids is not None:
+        rows = rows.filter(book_id__in=book_ids)
+    return set(rows.values_list("book_id", flat=True))
+
+
+@receiver(m2m_changed, sender=Shelf.books.through)
+def update_book_counters(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        # book.shelves.add(...) and friends, pk_set holds shelf ids
+        if action in ("pre_remove", "pre_clear"):
+            shelves = instance.shelves.all()
+            if pk_set is not None:
+                shelves = shelves.filter(pk__in=pk_set)
+            instance._counted_shelves = list(shelves)
+        elif action == "post_add":
+            for shelf in Shelf.objects.filter(pk__in=pk_set):
+                update_engagement_counters(shelf, [instance.pk], 1)
+        elif action in ("post_remove", "post_clear"):
+            for shelf in getattr(instance, "_counted_shelves", []):
+                update_engagement_counters(shelf, [instance.pk], -1)
+        return
+
+    if action in ("pre_remove", "pre_clear"):
+        # pk_set may hold books that are not on the shelf at all
+        instance._counted_book_ids = _shelf_book_ids(instance, pk_set)
+    elif action == "post_add":
+        update_engagement_counters(instance, pk_set, 1)
+    elif action in ("post_remove", "post_clear"):
+        update_engagement_counters(
+            instance, getattr(instance, "_counted_book_ids", ()), -1
+        )
+
+
+@receiver(m2m_changed, sender=Shelf.books.through)
+def touch_shelves(sender, instance, action, reverse, pk_set, **kwargs):
+    # membership is part of the shelf's version for conditional GETs
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    if not reverse:
+        shelf_ids = [instance.pk]
+    elif pk_set is not None:
+        shelf_ids = pk_set
+    else:
+        shelf_ids = [shelf.pk for shelf in getattr(instance, "_counted_shelves", [])]
+    Shelf.objects.filter(pk__in=shelf_ids).update(updated_at=Now())
+
+
+@receiver(m2m_changed, sender=Shelf.books.through)
+def sync_reading_status(sender, instance, action, reverse, pk_set, **kwargs):
+    # default shelf membership is mirrored in ReadingStatus
+    if action == "pre_add":
+        if not reverse:
+            user_ids = [instance.user_id] if instance.is_default else []
+        else:
+            user_ids = Shelf.objects.filter(
+                pk__in=pk_set, is_default=True
+            ).values_list("user_id", flat=True)
+        # before the entries are written, see lock_default_shelves
+        lock_default_shelves(user_ids)
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    if not reverse:
+        if not instance.is_default:
+            return
+        book_ids = getattr(instance, "_counted_book_ids", ())
+        changes = [(instance, pk_set if pk_set is not None else book_ids)]
+    elif action == "post_add":
+        shelves = Shelf.objects.filter(pk__in=pk_set, is_default=True)
+        changes = [(shelf, [instance.pk]) for shelf in shelves]
+    else:
+        shelves = getattr(instance, "_counted_shelves", [])
+        changes = [(shelf, [instance.pk]) for shelf in shelves if shelf.is_default]
+
+    for shelf, book_ids in changes:
+        if action == "post_add":
+            set_default_shelf(shelf, book_ids)
+        else:
+            clear_default_shelf(shelf, book_ids)
+
+
+@receiver(m2m_changed, sender=Shelf.books.through)
+def forget_memberships(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    if not reverse:
+        user_ids = [instance.user_id]
+    elif action == "post_add":
+        user_ids = Shelf.objects.filter(pk__in=pk_set).values_list(
+            "user_id", flat=True
+        )
+    else:
+        shelves = getattr(instance, "_counted_shelves", [])
+        user_ids = [shelf.user_id for shelf in shelves]
+    memberships_changed(user_ids)
+
+
+@receiver(post_delete, sender=Shelf)
+def forget_deleted_shelf(sender, instance, **kwargs):
+    memberships_changed([instance.user_id])
+
+
+@receiver(pre_delete, sender=Book)
+def forget_deleted_book(sender, instance, **kwargs):
+    # the book's shelf entries go with it without sending m2m_changed
+    shelves = Shelf.objects.filter(books=instance)
+    memberships_changed(shelves.values_list("user_id", flat=True))
+    shelves.update(updated_at=Now())
+
+
+@receiver(post_save, sender=ShelfEntry)
+def touch_entry_shelf(sender, instance, **kwargs):
+    # reading progress is rendered with the shelf's books
+    Shelf.objects.filter(pk=instance.shelf_id).update(updated_at=Now())
+
+
+@receiver(pre_delete, sender=Shelf)
+def release_book_counters(sender, instance, origin=None, **kwargs):
+    exclude_shelves = None
+    if isinstance(origin, User) or getattr(origin, "model", None) is User:
+        # every shelf of the user goes away, count each reader once
+        exclude_shelves = Q(shelf_id__gt=instance.pk)
+    update_engagement_counters(
+        instance, _shelf_book_ids(instance), -1, exclude_shelves=exclude_shelves
+    )
@@ -0,0 +1,76 @@
+from collections import defaultdict
+
+from .bulk import copy_progress
+from .models import ReadingStatus, Shelf
+
+
+def lock_default_shelves(user_ids):
+    """
+    Serialize default shelf changes per user. The unique (user, book) status
+    alone cannot stop two transactions from adding a book to two default
+    shelves, each reading the statuses before the other committed. Under
+    this lock the later one sees the earlier status and takes the book off
+    that shelf. Taken before the entries are inserted, so the lock order is
+    the same in every transaction.
+    """
+    user_ids = list(user_ids)
+    if user_ids:
+        list(
+            Shelf.objects.filter(user_id__in=user_ids, is_default=True)
+            .order_by("pk")
+            .select_for_update(no_key=True)
+            .values_list("pk", flat=True)
+        )
+
+
+def set_default_shelf(shelf, book_ids):
+    """
+    Record `book_ids` as being on the default `shelf`, one upsert, and take
+    any of them off the user's other default shelves with their reading
+    progress carried over to `shelf`.
+    """
+    book_ids = set(book_ids)
+    if not book_ids:
+        return
+
+    lock_default_shelves([shelf.user_id])
+
+    previous = defaultdict(list)
+    for book_id, status in (
+        ReadingStatus.objects.filter(user_id=shelf.user_id, book_id__in=book_ids)
+        .exclude(status=shelf.shelf_type)
+        .values_list("book_id", "status")
+    ):
+        previous[status].append(book_id)
+
+    ReadingStatus.objects.bulk_create(
+        [
+            ReadingStatus(user_id=shelf.user_id, book_id=pk, status=shelf.shelf_type)
+            for pk in book_ids
+        ],
+        update_conflicts=True,
+        unique_fields=["user", "book"],
+        update_fields=["status", "updated_at"],
+    )
+
+    for old in Shelf.objects.filter(
+        user_id=shelf.user_id, is_default=True, shelf_type__in=previous
+    ):
+        copy_progress(old, shelf, previous[old.shelf_type])
+        old.books.remove(*previous[old.shelf_type])
+
+
+def clear_default_shelf(shelf, book_ids):
+    """Forget the status of `book_ids` taken off the default `shelf`."""
+    ReadingStatus.objects.filter(
+        user_id=shelf.user_id, book_id__in=book_ids, status=shelf.shelf_type
+    ).delete()
+
+
+def reading_statuses(user, book_ids):
+    """{book id: status} of the books among `book_ids` on a default shelf."""
+    return dict(
+        ReadingStatus.objects.filter(user=user, book_id__in=book_ids).values_list(
+            "book_id", "status"
+        )
+    )
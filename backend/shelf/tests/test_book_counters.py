@@ -0,0 +1,72 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from book.models import Book
+from ..models import Shelf
+
+User = get_user_model()
+
+
+class BookCountersTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="reader",
+            first_name="Rea",
+            last_name="Der",
+            email="reader@example.com",
+            password="testpass123",
+        )
+        self.other = User.objects.create_user(
+            username="other",
+            first_name="Oth",
+            last_name="Er",
+            email="other@example.com",
+            password="testpass123",
+        )
+        self.book = Book.objects.create(title="Dune", isbn="9780441172719")
+        self.want = Shelf.objects.get(user=self.user, shelf_type="want_to_read")
+        self.read = Shelf.objects.get(user=self.user, shelf_type="read")
+        self.custom = Shelf.objects.create(user=self.user, name="Favourites")
+
+    def counters(self):
+        self.book.refresh_from_db()
+        return (
+            self.book.readers_count,
+            self.book.want_to_read_count,
+            self.book.currently_reading_count,
+            self.book.read_count,
+        )
+
+    def test_readers_counted_once_per_user(self):
+        self.want.books.add(self.book)
+        self.custom.books.add(self.book)
+        self.assertEqual(self.counters(), (1, 1, 0, 0))
+
+        Shelf.objects.get(user=self.other, shelf_type="read").books.add(self.book)
+        self.assertEqual(self.counters(), (2, 1, 0, 1))
+
+    def test_remove_keeps_reader_while_on_another_shelf(self):
+        self.want.books.add(self.book)
+        self.custom.books.add(self.book)
+
+        self.want.books.remove(self.book)
+        self.assertEqual(self.counters(), (1, 0, 0, 0))
+
+        self.custom.books.remove(self.book)
+        self.custom.books.remove(self.book)
+        self.assertEqual(self.counters(), (0, 0, 0, 0))
+
+    def test_deleting_custom_shelf(self):
+        self.custom.books.add(self.book)
+        self.custom.delete()
+        self.assertEqual(self.counters(), (0, 0, 0, 0))
+
+    def test_reconcile_command_repairs_drift(self):
+        self.read.books.add(self.book)
+        Book.objects.filter(pk=self.book.pk).update(readers_count=7, read_count=0)
+
+        call_command("reconcile_book_counters", stdout=StringIO())
+        self.assertEqual(self.counters(), (1, 0, 0, 1))
@@ -1,16 +1,34 @@
+from datetime import timedelta
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.contrib.auth import get_user_model
-from ..models import Shelf
+from ..models import ReadingStatus, Shelf, ShelfEntry
+from ..statuses import reading_statuses
 from book.models import Book, Author, Genre, Publisher
 
 User = get_user_model()
 
+# the tests clear the cache, keep them off the shared Redis
+LOCAL_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "shelf-tests",
+    }
+}
 
+
+@override_settings(CACHES=LOCAL_CACHES)
 class ShelfBooksTests(APITestCase):
     def setUp(self):
+        cache.clear()
         self.user = User.objects.create_user(
             username="testuser",
             first_name="Jane",
@@ -83,4 +101,259 @@ class ShelfBooksTests(APITestCase):
         url = reverse("shelf-books", args=[self.shelf.id])
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, [])
+        self.assertEqual(response.data["count"], 0)
+        self.assertEqual(response.data["results"], [])
+
+    def test_get_books_paginated_and_sorted(self):
+        zebra = Author.objects.create(name="Zed Zebra")
+        books = [self.book]
+        for number, title in enumerate(["Clean Code", "Basic Blocks"]):
+            book = Book.objects.create(title=title, isbn=f"111111111{number}")
+            book.authors.add(zebra)
+            books.append(book)
+        for book in books:
+            self.shelf.books.add(book)
+
+        url = reverse("shelf-books", args=[self.shelf.id])
+        response = self.client.get(url, {"page_size": 2})
+        self.assertEqual(response.data["count"], 3)
+        self.assertEqual(
+            [book["title"] for book in response.data["results"]],
+            ["Basic Blocks", "Clean Code"],
+        )
+        self.assertIsNotNone(response.data["next"])
+        self.assertEqual(
+            response.data["results"][0]["authors"],
+            [{"id": zebra.id, "name": "Zed Zebra"}],
+        )
+
+        response = self.client.get(url, {"ordering": "title"})
+        self.assertEqual(
+            [book["title"] for book in response.data["results"]],
+            ["API Mastery", "Basic Blocks", "Clean Code"],
+        )
+        response = self.client.get(url, {"ordering": "-author", "page_size": 1})
+        self.assertEqual(
+            response.data["results"][0]["authors"][0]["name"], "Zed Zebra"
+        )
+        response = self.client.get(url, {"title": "code"})
+        self.assertEqual(
+            [book["title"] for book in response.data["results"]], ["Clean Code"]
+        )
+
+    def test_get_books_query_count_does_not_grow(self):
+        url = reverse("shelf-books", args=[self.shelf.id])
+        self.shelf.books.add(self.book)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(url, {"ordering": "author"})
+
+        for number in range(10):
+            book = Book.objects.create(
+                title=f"Book {number}", isbn=f"22222222{number:02}"
+            )
+            book.authors.add(self.author)
+            book.genres.add(self.genre)
+            self.shelf.books.add(book)
+        cache.clear()
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(url, {"ordering": "author"})
+        self.assertEqual(len(response.data["results"]), 11)
+        self.assertEqual(len(many), len(few))
+
+    def test_get_books_with_shelf_entry(self):
+        older = Book.objects.create(title="Older", isbn="3333333333")
+        self.shelf.books.add(older, self.book)
+        ShelfEntry.objects.filter(shelf=self.shelf, book=older).update(
+            added_at=timezone.now() - timedelta(days=1)
+        )
+        entry = ShelfEntry.objects.get(shelf=self.shelf, book=self.book)
+        entry.pages_read = 120
+        entry.started_at = timezone.now().date()
+        entry.save()
+
+        url = reverse("shelf-books", args=[self.shelf.id])
+        results = self.client.get(url).data["results"]
+        self.assertEqual([book["id"] for book in results], [self.book.id, older.id])
+        self.assertEqual(results[0]["entry"]["pages_read"], 120)
+        self.assertEqual(results[0]["entry"]["added_at"], entry.added_at)
+        self.assertIsNone(results[1]["entry"]["started_at"])
+
+        results = self.client.get(url, {"ordering": "added"}).data["results"]
+        self.assertEqual([book["id"] for book in results], [older.id, self.book.id])
+
+    def test_bulk_add_move_and_remove(self):
+        books = [self.book] + [
+            Book.objects.create(title=f"Bulk {number}", isbn=f"44444444{number:02}")
+            for number in range(3)
+        ]
+        book_ids = [book.id for book in books]
+        read = Shelf.objects.get(user=self.user, shelf_type="read")
+        url = reverse("shelf-bulk")
+
+        self.shelf.books.add(self.book)
+        response = self.client.post(
+            url, {"book_ids": book_ids, "add_to": self.shelf.id}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"added": 3, "removed": 0})
+        self.assertEqual(self.shelf.books.count(), 4)
+
+        ShelfEntry.objects.filter(shelf=self.shelf, book=self.book).update(
+            pages_read=42
+        )
+        response = self.client.post(
+            url,
+            {
+                "book_ids": book_ids[:2],
+                "add_to": read.id,
+                "remove_from": self.shelf.id,
+            },
+            format="json",
+        )
+        self.assertEqual(response.data, {"added": 2, "removed": 2})
+        self.assertEqual(
+            set(read.books.values_list("id", flat=True)), set(book_ids[:2])
+        )
+        self.assertEqual(
+            ShelfEntry.objects.get(shelf=read, book=self.book).pages_read, 42
+        )
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.readers_count, 1)
+        self.assertEqual(self.book.want_to_read_count, 0)
+        self.assertEqual(self.book.read_count, 1)
+        stats = self.user.stats
+        stats.refresh_from_db()
+        self.assertEqual((stats.read, stats.want_to_read), (2, 2))
+
+        response = self.client.post(
+            url, {"book_ids": book_ids, "remove_from": self.shelf.id}, format="json"
+        )
+        self.assertEqual(response.data, {"added": 0, "removed": 2})
+        self.assertFalse(self.shelf.books.exists())
+
+    def test_bulk_add_skips_entries_added_meanwhile(self):
+        other = Book.objects.create(title="Other", isbn="5555555555")
+        # as if a concurrent add committed between validation and insert
+        ShelfEntry.objects.create(shelf=self.shelf, book=other)
+
+        response = self.client.post(
+            reverse("shelf-bulk"),
+            {"book_ids": [self.book.id, other.id], "add_to": self.shelf.id},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"added": 1, "removed": 0})
+        self.book.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(
+            (self.book.want_to_read_count, other.want_to_read_count), (1, 0)
+        )
+
+    def test_bulk_validation(self):
+        url = reverse("shelf-bulk")
+        other = User.objects.create_user(
+            username="other",
+            first_name="John",
+            last_name="Doe",
+            email="other@gmail.com",
+            password="testpass123",
+        )
+        other_shelf = Shelf.objects.filter(user=other).first()
+
+        for data in (
+            {"book_ids": [self.book.id]},
+            {"book_ids": [self.book.id], "add_to": other_shelf.id},
+            {"book_ids": [999999], "add_to": self.shelf.id},
+            {
+                "book_ids": [self.book.id],
+                "add_to": self.shelf.id,
+                "remove_from": self.shelf.id,
+            },
+        ):
+            response = self.client.post(url, data, format="json")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(self.shelf.books.exists())
+
+    def test_one_default_shelf_per_book(self):
+        read = Shelf.objects.get(user=self.user, shelf_type="read")
+        custom = Shelf.objects.create(user=self.user, name="Favorites")
+        self.shelf.books.add(self.book)
+        custom.books.add(self.book)
+        ShelfEntry.objects.filter(shelf=self.shelf, book=self.book).update(
+            pages_read=10
+        )
+        self.assertEqual(
+            reading_statuses(self.user, [self.book.id]),
+            {self.book.id: "want_to_read"},
+        )
+
+        read.books.add(self.book)
+        self.assertFalse(self.shelf.books.filter(pk=self.book.pk).exists())
+        self.assertTrue(custom.books.filter(pk=self.book.pk).exists())
+        self.assertEqual(
+            ShelfEntry.objects.get(shelf=read, book=self.book).pages_read, 10
+        )
+        self.assertEqual(
+            reading_statuses(self.user, [self.book.id]), {self.book.id: "read"}
+        )
+        self.book.refresh_from_db()
+        self.assertEqual(
+            (self.book.readers_count, self.book.want_to_read_count), (1, 0)
+        )
+
+        self.book.shelves.remove(read)
+        self.assertEqual(reading_statuses(self.user, [self.book.id]), {})
+        self.shelf.books.add(self.book)
+        read.books.clear()
+        self.assertEqual(
+            reading_statuses(self.user, [self.book.id]),
+            {self.book.id: "want_to_read"},
+        )
+
+    def test_sync_reading_statuses_command(self):
+        read = Shelf.objects.get(user=self.user, shelf_type="read")
+        self.shelf.books.add(self.book)
+        # a duplicate written behind the signals' back, the newer one wins
+        ShelfEntry.objects.create(shelf=read, book=self.book)
+        ReadingStatus.objects.all().delete()
+
+        call_command("sync_reading_statuses", stdout=StringIO())
+        self.assertEqual(
+            reading_statuses(self.user, [self.book.id]), {self.book.id: "read"}
+        )
+        self.assertFalse(self.shelf.books.filter(pk=self.book.pk).exists())
+        self.assertTrue(read.books.filter(pk=self.book.pk).exists())
+
+    def test_shelf_membership(self):
+        cache.clear()
+        other = Book.objects.create(title="Other", isbn="5555555555")
+        custom = Shelf.objects.create(user=self.user, name="Favorites")
+        self.shelf.books.add(self.book)
+        custom.books.add(self.book)
+
+        url = reverse("shelf-membership")
+        params = {"book_ids": f"{other.id},{self.book.id},999999"}
+        with self.assertNumQueries(1):
+            response = self.client.get(url, params)
+        self.assertEqual(
+            response.data["results"],
+            [
+                {"book_id": other.id, "shelves": []},
+                {"book_id": self.book.id, "shelves": [self.shelf.id, custom.id]},
+                {"book_id": 999999, "shelves": []},
+            ],
+        )
+        with self.assertNumQueries(0):
+            self.client.get(url, params)
+
+        custom.books.add(other)
+        response = self.client.get(url, params)
+        self.assertEqual(response.data["results"][0]["shelves"], [custom.id])
+
+        # cascaded entries do not send m2m_changed
+        other.delete()
+        response = self.client.get(url, params)
+        self.assertEqual(response.data["results"][0]["shelves"], [])
+
+        response = self.client.get(url, {"book_ids": "1,x"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -2,6 +2,7 @@ from django.contrib.auth import get_user_model
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
+from book.models import Book
 from ..models import Shelf
 
 User = get_user_model()
@@ -134,3 +135,77 @@ class ShelfTests(APITestCase):
 
         response = self.client.get(reverse('shelf-list'))
         self.assertEqual(response.data['count'], 3)
+
+    def test_conditional_get_shelf(self):
+        shelf = self.default_shelves.get(shelf_type='read')
+        url = reverse('shelf-detail', args=[shelf.id])
+        response = self.client.get(url)
+        etag = response['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        book = Book.objects.create(title='Dune', isbn='9780441013593')
+        shelf.books.add(book)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_conditional_get_shelf_list(self):
+        url = reverse('shelf-list')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Shelf.objects.create(user=self.user, name='New Shelf', is_default=False)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_shelf_list_etag_ignores_other_readers(self):
+        book = Book.objects.create(title='Dune', isbn='9780441013593')
+        url = reverse('shelf-list')
+        etag = self.client.get(url)['ETag']
+
+        other = User.objects.create_user(
+            username='reader',
+            first_name='John',
+            last_name='Doe',
+            email='reader@gmail.com',
+            password='testpass123'
+        )
+        Shelf.objects.get(user=other, shelf_type='read').books.add(book)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        book.cover_image = 'https://example.com/dune.jpg'
+        book.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_list_shelves_with_counts_and_covers(self):
+        read = self.default_shelves.get(shelf_type='read')
+        books = [
+            Book.objects.create(
+                title=f'Book {number}',
+                isbn=f'66666666{number:02}',
+                cover_image=f'https://example.com/{number}.jpg'
+            )
+            for number in range(5)
+        ]
+        read.books.add(*books[:4])
+        read.books.add(books[4])
+
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('shelf-list'))
+        shelves = {shelf['id']: shelf for shelf in response.data['results']}
+        self.assertEqual(shelves[read.id]['book_count'], 5)
+        self.assertEqual(
+            shelves[read.id]['cover_previews'][0],
+            {'book_id': books[4].id, 'cover_image': 'https://example.com/4.jpg'}
+        )
+        self.assertEqual(len(shelves[read.id]['cover_previews']), 3)
+        want = self.default_shelves.get(shelf_type='want_to_read')
+        self.assertEqual(shelves[want.id]['book_count'], 0)
+        self.assertEqual(shelves[want.id]['cover_previews'], [])
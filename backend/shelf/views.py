@@ -2,20 +2,134 @@ from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.exceptions import ValidationError
-from .models import Shelf
+from django.db.models import Count, F, Max, Window
+from django.db.models.functions import Left, RowNumber
+from django_filters.utils import translate_validation
+from .bulk import reshelve
+from .filters import ShelfBookOrderingFilter
+from .membership import shelf_memberships
+from .models import Shelf, ShelfEntry
+from .pagination import ShelfBookPagination
 from .serializers import (
     ShelfSerializer,
+    ShelfListSerializer,
     AddBookToShelfSerializer,
+    BulkShelfBooksSerializer,
     RemoveBookFromShelfSerializer)
-from book.serializers import BookSerializer
+from book.caching import counters_epoch, get_generations
+from book.filters import BookFilter, BookSearchFilter
+from book.models import Author, Book, Genre, Publisher
+from book.serializers import BookListSerializer
+from review.models import Review
+from core.conditional import ConditionalGetMixin
 
 
-class ShelfViewSet(viewsets.ModelViewSet):
+class ShelfViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = ShelfSerializer
     permission_classes = [permissions.IsAuthenticated]
+    etag_per_user = True
+
+    # rendered with every book of the shelf's book list
+    entry_fields = ("added_at", "pages_read", "started_at", "finished_at")
+
+    # newest covers shown with each shelf of the list page
+    cover_preview_count = 3
+
+    membership_param = "book_ids"
+    max_membership_books = 100
 
     def get_queryset(self):
-        return Shelf.objects.filter(user=self.request.user)
+        shelves = Shelf.objects.filter(user=self.request.user)
+        if self.action == "list":
+            shelves = shelves.annotate(book_count=Count("entries")).order_by("pk")
+        return shelves
+
+    def get_serializer_class(self):
+        if self.action == "list":
+            return ShelfListSerializer
+        return super().get_serializer_class()
+
+    def get_version(self):
+        shelves = Shelf.objects.filter(user=self.request.user)
+        if self.action == "list":
+            # membership touches the shelves. Covers are catalog data, the
+            # Book generation only moves with catalog writes, never with
+            # counters (see book.counters), so other readers leave it alone
+            return (
+                *shelves.aggregate(Max("updated_at"), Count("id")).values(),
+                *get_generations([Book]),
+            )
+        if self.action not in ("retrieve", "books"):
+            return None
+
+        updated_at = self.get_shelf_updated_at()
+        if updated_at is None or self.action == "retrieve":
+            return updated_at
+        # the book list also renders catalog data
+        version = (
+            updated_at,
+            get_generations([Book, Author, Publisher, Genre]),
+            counters_epoch(),
+        )
+        if ShelfBookOrderingFilter().get_ordering(self.request) in (
+            "rating",
+            "-rating",
+        ):
+            # the personal rating sort follows the user's reviews
+            reviews = Review.objects.filter(user=self.request.user)
+            version += tuple(
+                reviews.aggregate(Max("updated_at"), Count("id")).values()
+            )
+        return version
+
+    def get_last_modified(self):
+        if self.action == "retrieve":
+            return self.get_shelf_updated_at()
+        return None
+
+    def get_shelf_updated_at(self):
+        if not hasattr(self, "_shelf_updated_at"):
+            try:
+                self._shelf_updated_at = (
+                    self.get_queryset()
+                    .filter(pk=self.kwargs["pk"])
+                    .values_list("updated_at", flat=True)
+                    .first()
+                )
+            except ValueError:
+                self._shelf_updated_at = None
+        return self._shelf_updated_at
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None and self.action == "list":
+            self.add_cover_previews(page)
+        return page
+
+    def add_cover_previews(self, shelves):
+        """
+        The newest `cover_preview_count` books of every shelf on the page,
+        one windowed query over their entries.
+        """
+        shelves = list(shelves)
+        previews = (
+            ShelfEntry.objects.filter(shelf__in=shelves)
+            .annotate(
+                row=Window(
+                    RowNumber(),
+                    partition_by=F("shelf_id"),
+                    order_by=[F("added_at").desc(), F("pk").desc()],
+                )
+            )
+            .filter(row__lte=self.cover_preview_count)
+            .order_by("shelf_id", "row")
+            .values_list("shelf_id", "book_id", "book__cover_image")
+        )
+        by_shelf = {shelf.pk: [] for shelf in shelves}
+        for shelf_id, book_id, cover_image in previews:
+            by_shelf[shelf_id].append({"book_id": book_id, "cover_image": cover_image})
+        for shelf in shelves:
+            shelf.cover_previews = by_shelf[shelf.pk]
 
     def perform_create(self, serializer):
         try:
@@ -28,13 +142,86 @@ class ShelfViewSet(viewsets.ModelViewSet):
             raise ValidationError("Cannot delete default shelves")
         instance.delete()
 
-    @action(detail=True, methods=["get"])
+    @action(detail=False, methods=["get"])
+    def membership(self, request):
+        """
+        GET /shelves/membership/?book_ids=3,1,2 - The user's shelves holding
+        each of the books, answered from the cached membership arrays
+        """
+        try:
+            book_ids = [
+                int(pk)
+                for pk in request.query_params.get(self.membership_param, "").split(",")
+                if pk.strip()
+            ]
+        except ValueError:
+            raise ValidationError({self.membership_param: "Expected integer ids"})
+
+        book_ids = list(dict.fromkeys(book_ids))
+        if len(book_ids) > self.max_membership_books:
+            raise ValidationError(
+                {
+                    self.membership_param: (
+                        f"At most {self.max_membership_books} ids per request"
+                    )
+                }
+            )
+        memberships = shelf_memberships(request.user.pk, book_ids)
+        return Response(
+            {
+                "results": [
+                    {"book_id": pk, "shelves": memberships[pk]} for pk in book_ids
+                ]
+            }
+        )
+
+    @action(detail=True, methods=["get"], pagination_class=ShelfBookPagination)
     def books(self, request, pk=None):
-        """GET /shelves/{id}/books/ - List books on a shelf"""
+        """
+        GET /shelves/{id}/books/ - Page through the books on a shelf
+
+        Takes the catalog filters and ?search=, sorts with ?ordering= (see
+        ShelfBookOrderingFilter) and renders the slim book cards with the
+        shelf entry, so a page costs the same few queries however large the
+        shelf is.
+        """
         shelf = self.get_object()
-        books = shelf.books.all()
-        serializer = BookSerializer(books, many=True)
-        return Response(serializer.data)
+        books = self.filter_shelf_books(self.get_shelf_books(shelf))
+        page = self.paginate_queryset(books)
+        serializer = BookListSerializer(
+            page, many=True, context=self.get_serializer_context()
+        )
+        data = serializer.data
+        for card, book in zip(data, page):
+            card["entry"] = {
+                name: getattr(book, name) for name in self.entry_fields
+            }
+        return self.get_paginated_response(data)
+
+    def get_shelf_books(self, shelf):
+        # the entry columns come from the join the shelf filter makes
+        return (
+            Book.objects.filter(shelf_entries__shelf=shelf)
+            .defer("search_vector", "description")
+            .annotate(
+                **{
+                    name: F(f"shelf_entries__{name}")
+                    for name in self.entry_fields
+                },
+                description_preview=Left(
+                    "description", BookListSerializer.DESCRIPTION_LENGTH
+                ),
+            )
+        )
+
+    def filter_shelf_books(self, books):
+        filterset = BookFilter(
+            self.request.query_params, queryset=books, request=self.request
+        )
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+        books = BookSearchFilter().filter_queryset(self.request, filterset.qs, self)
+        return ShelfBookOrderingFilter().filter_queryset(self.request, books, self)
 
     @action(detail=True, methods=["post"])
     def add_book(self, request, pk=None):
@@ -61,3 +248,22 @@ class ShelfViewSet(viewsets.ModelViewSet):
         shelf.books.remove(book)
         return Response(
             {"detail": "Book removed from shelf."}, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """
+        POST /shelves/bulk/ - Add, remove or move many books at once
+
+        {"book_ids": [...], "add_to": shelf id, "remove_from": shelf id},
+        either shelf alone adds or removes, both move the books.
+        """
+        serializer = BulkShelfBooksSerializer(
+            data=request.data, context=self.get_serializer_context())
+        serializer.is_valid(raise_exception=True)
+        added, removed = reshelve(
+            serializer.validated_data['book_ids'],
+            add_to=serializer.validated_data.get('add_to'),
+            remove_from=serializer.validated_data.get('remove_from'),
+        )
+        return Response(
+            {"added": added, "removed": removed}, status=status.HTTP_200_OK)
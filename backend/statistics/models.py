@@ -17,6 +17,7 @@ class UserStatistics(models.Model):
         null=True,
         blank=True,
     )
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"Stats for {self.user}"
\ No newline at end of file
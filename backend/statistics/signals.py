@@ -13,8 +13,20 @@ def shelf_changed(sender, instance, **kwargs):
     recalculate_for(instance.user)
 
 @receiver(m2m_changed, sender=Shelf.books.through)
-def shelf_books_changed(sender, instance, **kwargs):
-    recalculate_for(instance.user)
+def shelf_books_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        recalculate_for(instance.user)
+        return
+
+    # book.shelves.add(...) and friends, pk_set holds shelf ids
+    if pk_set is not None:
+        shelves = Shelf.objects.filter(pk__in=pk_set).select_related("user")
+    else:
+        shelves = getattr(instance, "_counted_shelves", [])
+    for user in {shelf.user_id: shelf.user for shelf in shelves}.values():
+        recalculate_for(user)
 
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL, dispatch_uid="stats_autocreate")
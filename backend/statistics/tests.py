@@ -71,6 +71,17 @@ class UserStatisticsTests(APITestCase):
         self.assertEqual(data["want_to_read"], 0)
         self.assertEqual(data["favourite_genre"]["name"], "SF")
 
+    def test_statistics_follow_reverse_shelf_changes(self):
+        url = reverse("my-stats")
+        self.book1.shelves.add(self.read)
+        response = self.client.get(url)
+        self.assertEqual(response.json()["read"], 1)
 
+        self.book1.shelves.remove(self.read)
+        self.book2.shelves.add(self.current)
+        data = self.client.get(url).json()
+        self.assertEqual((data["read"], data["in_progress"]), (0, 1))
 
-
+        self.book2.shelves.clear()
+        data = self.client.get(url).json()
+        self.assertEqual(data["in_progress"], 0)
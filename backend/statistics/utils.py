@@ -1,8 +1,39 @@
+import threading
+from contextlib import contextmanager
+
 from django.db.models import Count, Q
 from shelf.models import Shelf
 from book.models import Genre
 
+# users waiting for a recalculation inside deferred_recalculation()
+_deferred = threading.local()
+
+
+@contextmanager
+def deferred_recalculation():
+    """
+    Collect the recalculate_for() calls made inside the block and run one
+    per user when it exits, so a bulk shelf change that fires several shelf
+    signals recalculates once.
+    """
+    if getattr(_deferred, "users", None) is not None:
+        yield
+        return
+
+    _deferred.users = {}
+    try:
+        yield
+    finally:
+        users, _deferred.users = _deferred.users, None
+    for user in users.values():
+        recalculate_for(user)
+
+
 def recalculate_for(user):
+    users = getattr(_deferred, "users", None)
+    if users is not None:
+        users[user.pk] = user
+        return
 
     agg = (
         Shelf.objects
@@ -24,15 +55,16 @@ def recalculate_for(user):
 
     from statistics.models import UserStatistics
     stats, _ = UserStatistics.objects.get_or_create(user=user)
-    stats.read = counts.get("read", 0)
-    stats.in_progress = counts.get("currently_reading", 0)
-    stats.want_to_read = counts.get("want_to_read", 0)
-    stats.favourite_genre = favourite
-    stats.save(
-        update_fields=[
-            "read",
-            "in_progress",
-            "want_to_read",
-            "favourite_genre",
-        ]
-    )
\ No newline at end of file
+    values = {
+        "read": counts.get("read", 0),
+        "in_progress": counts.get("currently_reading", 0),
+        "want_to_read": counts.get("want_to_read", 0),
+        "favourite_genre_id": favourite.pk if favourite else None,
+    }
+    # an unchanged row keeps its updated_at, clients revalidate against it
+    if all(getattr(stats, name) == value for name, value in values.items()):
+        return
+
+    for name, value in values.items():
+        setattr(stats, name, value)
+    stats.save(update_fields=[*values, "updated_at"])
\ No newline at end of file
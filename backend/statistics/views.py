@@ -2,19 +2,47 @@ from rest_framework.generics import RetrieveAPIView
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from statistics.serializers import UserStatisticsSerializer
 from statistics.models import UserStatistics
+from book.caching import get_generations
+from book.models import Genre
+from core.conditional import ConditionalGetMixin
 
-class MyStatsView(RetrieveAPIView):
+
+class StatsVersionMixin(ConditionalGetMixin):
+    etag_per_user = True
+
+    def get_stats_user_id(self):
+        raise NotImplementedError
+
+    def get_version(self):
+        updated_at = (
+            UserStatistics.objects.filter(user_id=self.get_stats_user_id())
+            .values_list("updated_at", flat=True)
+            .first()
+        )
+        if updated_at is None:
+            return None
+        # the favourite genre is rendered with its name
+        return updated_at, get_generations([Genre])
+
+
+class MyStatsView(StatsVersionMixin, RetrieveAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = UserStatisticsSerializer
 
+    def get_stats_user_id(self):
+        return self.request.user.pk
+
     def get_object(self):
         stats, _ = UserStatistics.objects.get_or_create(user=self.request.user)
         return stats
 
 
-class UserStatsView(RetrieveAPIView):
+class UserStatsView(StatsVersionMixin, RetrieveAPIView):
     permission_classes = [IsAdminUser]
     serializer_class = UserStatisticsSerializer
     queryset = UserStatistics.objects.select_related("user")
 
-    lookup_field = "user_id"  
\ No newline at end of file
+    lookup_field = "user_id"
+
+    def get_stats_user_id(self):
+        return self.kwargs["user_id"]
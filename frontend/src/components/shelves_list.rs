@@ -71,9 +71,30 @@ pub async fn remove_book_from_shelf((book_id, shelf_id): (usize, usize)) -> anyh
     }
 }
 
+#[allow(dead_code, reason = "Faithful representation of endpoint data")]
+#[derive(Debug, Default, Deserialize, Clone)]
+struct ShelfBooksResponse {
+    count: usize,
+    next: Option<String>,
+    previous: Option<String>,
+    results: Vec<Book>,
+}
+
 async fn get_books_from_shelf(shelf_id: usize) -> anyhow::Result<Vec<Book>> {
     let endpoint = format!("/api/shelf/shelves/{shelf_id}/books/");
-    return send_get_request(&endpoint).await;
+    let mut res: ShelfBooksResponse = send_get_request(&endpoint).await?;
+    let mut ret = vec![res];
+
+    while let Some(ref endpoint) = ret.last().unwrap().next {
+        res = send_get_request(endpoint).await?;
+        ret.push(res);
+    }
+
+    Ok(ret
+        .into_iter()
+        .map(|ShelfBooksResponse { results, .. }| results)
+        .flatten()
+        .collect())
 }
 
 #[allow(dead_code, reason = "Faithful representation of endpoint data")]